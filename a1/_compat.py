@@ -0,0 +1,36 @@
+"""
+Optional speedups with fallbacks — the [fast] extra (pip install
+pocketcoder-a1[fast]) and features of newer Pythons
+"""
+
+import hashlib
+import sys
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# @dataclass(**DATACLASS_SLOTS): slotted on 3.10+, a plain dataclass before
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+
+def new_hash():
+    """Hasher for content keys — xxh3-128 if available, else blake2b-128 (not for security)"""
+    return xxhash.xxh3_128() if xxhash else hashlib.blake2b(digest_size=16)
+
+
+def shutdown_cancelling(executor, wait: bool = True):
+    """executor.shutdown() dropping work that hasn't started
+
+    cancel_futures is 3.9+; on 3.8 queued work still runs.
+    """
+    if sys.version_info >= (3, 9):
+        executor.shutdown(wait=wait, cancel_futures=True)
+    else:
+        executor.shutdown(wait=wait)
@@ -3,10 +3,20 @@ Checkpoint Manager — сохранение состояния между сес
 """
 
 import json
+import os
 from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 
+from ._compat import orjson as _orjson
+
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    """Serialize a checkpoint as indented UTF-8 JSON"""
+    if _orjson:
+        return _orjson.dumps(data, option=_orjson.OPT_INDENT_2)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
 
 class CheckpointManager:
     """Управление checkpoint'ами для автономной работы"""
@@ -17,34 +27,62 @@ class CheckpointManager:
         self.checkpoint_file = self.a1_dir / "checkpoint.json"
         self.checkpoints_dir = self.a1_dir / "checkpoints"
 
+        # Last loaded/saved checkpoint, valid while the file's (mtime_ns, size) match
+        self._cache: Optional[Dict[str, Any]] = None
+        self._cache_key: Optional[tuple] = None
+
         # Создаём структуру если не существует
         self.a1_dir.mkdir(parents=True, exist_ok=True)
         self.checkpoints_dir.mkdir(exist_ok=True)
 
+    def _file_key(self) -> Optional[tuple]:
+        """Cheap change detector for checkpoint.json (None if missing)"""
+        try:
+            st = os.stat(self.checkpoint_file)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
     def load(self) -> Dict[str, Any]:
-        """Загрузить текущий checkpoint"""
-        if not self.checkpoint_file.exists():
+        """Загрузить текущий checkpoint
+
+        Returns the cached dict while the file is unchanged on disk (the agent
+        edits it externally, so mtime is re-checked on every call). Callers
+        that mutate the result must save() it.
+        """
+        key = self._file_key()
+        if key is None:
+            self._cache = None
             return self._create_initial()
+        if self._cache is not None and key == self._cache_key:
+            return self._cache
 
         try:
             with open(self.checkpoint_file, "r") as f:
-                return json.load(f)
+                data = json.load(f)
         except (json.JSONDecodeError, IOError):
             return self._create_initial()
 
+        self._cache, self._cache_key = data, key
+        return data
+
     def save(self, checkpoint: Dict[str, Any]) -> None:
         """Сохранить checkpoint"""
         checkpoint["updated_at"] = datetime.now().isoformat()
 
-        # Сохраняем текущий
-        with open(self.checkpoint_file, "w") as f:
-            json.dump(checkpoint, f, indent=2, ensure_ascii=False)
+        # Serialize once — the same bytes go to the current file and the archive
+        payload = _dumps(checkpoint)
+
+        # Сохраняем текущий (atomic: readers never see a half-written file)
+        tmp_file = self.checkpoint_file.with_name(self.checkpoint_file.name + ".tmp")
+        tmp_file.write_bytes(payload)
+        os.replace(tmp_file, self.checkpoint_file)
+        self._cache, self._cache_key = checkpoint, self._file_key()
 
         # Архивируем копию
         session = checkpoint.get("session", 0)
         archive_file = self.checkpoints_dir / f"session_{session:03d}.json"
-        with open(archive_file, "w") as f:
-            json.dump(checkpoint, f, indent=2, ensure_ascii=False)
+        archive_file.write_bytes(payload)
 
     def _create_initial(self) -> Dict[str, Any]:
         """Создать начальный checkpoint"""
@@ -166,11 +166,22 @@ def cmd_test(args):
     """Run E2E tests with real Playwright browser"""
     project_dir = Path(args.project).resolve()
 
+    if args.shutdown:
+        from .tester.browser import shutdown_persistent_chromium
+        if shutdown_persistent_chromium(project_dir / ".a1"):
+            print("Persistent browser stopped.")
+        else:
+            print("No persistent browser running.")
+        return 0
+
     from .tester.runner import VisionTester
 
     tester = VisionTester(
         project_dir=project_dir,
         base_url=f"http://localhost:{args.port}",
+        workers=args.workers,
+        persistent=args.persistent,
+        force=args.force,
     )
 
     if args.scenario:
@@ -340,6 +351,14 @@ def main():
     p_test = subparsers.add_parser("test", help="Run E2E tests with real Playwright browser")
     p_test.add_argument("-s", "--scenario", type=int, help="Run specific scenario (1-7)")
     p_test.add_argument("--port", type=int, default=7331, help="Dashboard port (default: 7331)")
+    p_test.add_argument("-w", "--workers", type=int, default=1,
+                        help="Run scenarios in parallel, one browser context each (default: 1)")
+    p_test.add_argument("--persistent", action="store_true",
+                        help="Keep Chromium running between runs and reattach to it")
+    p_test.add_argument("--shutdown", action="store_true",
+                        help="Stop the persistent Chromium and exit")
+    p_test.add_argument("--force", action="store_true",
+                        help="Re-run scenarios whose sources are unchanged since they passed")
     p_test.set_defaults(func=cmd_test)
 
     # config
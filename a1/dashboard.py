@@ -5,11 +5,12 @@ PocketCoder-A1 Dashboard — Full-featured Web UI
 
 import html as html_mod
 import json
+import os
 import socket
 import threading
 import webbrowser
 from datetime import datetime
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from string import Template
 from urllib.parse import parse_qs, urlparse
@@ -20,6 +21,13 @@ from .tasks import TaskManager
 PROJECT_DIR = None
 AGENT_RUNNING = False
 AGENT_LOOP = None  # Reference to SessionLoop for stop control
+_AGENT_LOCK = threading.Lock()  # Guards AGENT_RUNNING/AGENT_LOOP check-then-act
+# POSTs that read-modify-write tasks.json / queue.json / config — one at a time,
+# or concurrent handlers (ThreadingHTTPServer) lose each other's updates
+_STATE_LOCK = threading.Lock()
+_STATE_POSTS = frozenset({
+    '/add-task', '/add-thought', '/transform-confirm', '/queue-message', '/api/config', '/api/reorder',
+})
 ACTIVITY_LOG = []  # Live activity log
 AGENT_LOG_BUFFER = []  # Live agent output lines for dashboard
 
@@ -76,6 +84,21 @@ def _on_agent_line(line: str, event_type: str = None):
         AGENT_LOG_BUFFER.pop(0)
 
 
+def _on_agent_lines(events):
+    """Bulk variant of _on_agent_line for batched (text, event_type) pairs."""
+    now = datetime.now().strftime("%H:%M:%S")
+    for line, event_type in events:
+        stripped = line.rstrip("\n")
+        if stripped:
+            AGENT_LOG_BUFFER.append({
+                "time": now,
+                "line": stripped,
+                "type": event_type if event_type else _classify_line(line),
+            })
+    if len(AGENT_LOG_BUFFER) > 500:
+        del AGENT_LOG_BUFFER[:-500]
+
+
 CSS = '''
 :root {
     --bg-primary: #f8f9fa;
@@ -1338,6 +1361,13 @@ class DashboardHandler(BaseHTTPRequestHandler):
         post_data = self.rfile.read(content_length).decode('utf-8')
         params = parse_qs(post_data)
 
+        if self.path in _STATE_POSTS:
+            with _STATE_LOCK:
+                self._route_post(post_data, params)
+        else:
+            self._route_post(post_data, params)
+
+    def _route_post(self, post_data: str, params: dict):
         if self.path == '/add-task':
             task_text = params.get('task', [''])[0]
             task_desc = params.get('description', [''])[0]
@@ -1411,7 +1441,10 @@ class DashboardHandler(BaseHTTPRequestHandler):
                     "added_at": datetime.now().isoformat(),
                     "read": False,
                 })
-                queue_file.write_text(json.dumps(queue_data, indent=2, ensure_ascii=False))
+                # atomic: the agent reads queue.json while we write it
+                tmp_file = queue_file.with_name(f'{queue_file.name}.{os.getpid()}.tmp')
+                tmp_file.write_text(json.dumps(queue_data, indent=2, ensure_ascii=False))
+                os.replace(tmp_file, queue_file)
                 log_activity("Message queued", msg_text[:50], "info")
             self.send_response(200)
             self.send_header('Content-Type', 'application/json')
@@ -2416,8 +2449,9 @@ Return format: [{{"title": "...", "description": "..."}}, ...]'''
 
         # Get live metrics from agent loop if running
         metrics = {}
-        if AGENT_LOOP and hasattr(AGENT_LOOP, 'get_session_metrics'):
-            metrics = AGENT_LOOP.get_session_metrics()
+        loop = AGENT_LOOP  # snapshot — the worker thread may clear it concurrently
+        if loop and hasattr(loop, 'get_session_metrics'):
+            metrics = loop.get_session_metrics()
         else:
             # Try to load from checkpoint
             cp = checkpoint.load()
@@ -2496,36 +2530,46 @@ Return format: [{{"title": "...", "description": "..."}}, ...]'''
         return esc('\n'.join(e['line'] for e in AGENT_LOG_BUFFER[-50:]))
 
     def start_agent(self):
-        global AGENT_RUNNING, AGENT_LOOP
-        if not AGENT_RUNNING:
-            AGENT_LOG_BUFFER.clear()
-            log_activity("Agent started", "", "success")
-
-            def run():
-                global AGENT_RUNNING, AGENT_LOOP
-                AGENT_RUNNING = True
-                try:
-                    from .config import Config
-                    from .loop import SessionLoop
-                    config = Config(PROJECT_DIR)
-                    resolved = config.resolve()
-                    loop = SessionLoop(project_dir=PROJECT_DIR, **resolved)
-                    loop._log_callback = _on_agent_line
+        global AGENT_RUNNING
+        with _AGENT_LOCK:
+            if AGENT_RUNNING:
+                return
+            # Claim the slot before the thread starts so a double POST can't spawn two loops
+            AGENT_RUNNING = True
+        AGENT_LOG_BUFFER.clear()
+        log_activity("Agent started", "", "success")
+
+        def run():
+            global AGENT_RUNNING, AGENT_LOOP
+            try:
+                from .config import Config
+                from .loop import SessionLoop
+                config = Config(PROJECT_DIR)
+                resolved = config.resolve()
+                loop = SessionLoop(project_dir=PROJECT_DIR, **resolved)
+                loop._log_callback = _on_agent_line
+                loop._log_callback_bulk = _on_agent_lines
+                with _AGENT_LOCK:
+                    if not AGENT_RUNNING:
+                        return  # stop requested while we were setting up
                     AGENT_LOOP = loop
-                    loop.start()
-                finally:
+                loop.start()
+            finally:
+                with _AGENT_LOCK:
                     AGENT_RUNNING = False
                     AGENT_LOOP = None
-                    log_activity("Agent stopped", "", "warning")
+                log_activity("Agent stopped", "", "warning")
 
-            thread = threading.Thread(target=run, daemon=True)
-            thread.start()
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
 
     def stop_agent(self):
-        global AGENT_RUNNING, AGENT_LOOP
-        if AGENT_LOOP:
-            AGENT_LOOP.stop()
-        AGENT_RUNNING = False
+        global AGENT_RUNNING
+        with _AGENT_LOCK:
+            loop = AGENT_LOOP
+            AGENT_RUNNING = False
+        if loop:
+            loop.stop()
         log_activity("Agent stop requested", "", "warning")
 
 
@@ -2559,7 +2603,8 @@ def run_dashboard(project_dir: Path, port: int = None, open_browser: bool = True
         except RuntimeError:
             port = find_free_port(7331)
 
-    server = HTTPServer(('localhost', port), DashboardHandler)
+    # Threaded so a slow page (git log, AI transform) doesn't stall the live polls
+    server = ThreadingHTTPServer(('localhost', port), DashboardHandler)
 
     url = f'http://localhost:{port}'
     print()
@@ -2,16 +2,350 @@
 Session Loop — основной цикл автономной работы
 """
 
+import glob
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import re
+import select
+import shutil
 import signal
 import subprocess
+import sys
+import threading
 import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
+from ._compat import DATACLASS_SLOTS
+from ._compat import orjson as _orjson
 from .checkpoint import CheckpointManager
 from .tasks import TaskManager
-from .validator import Validator
+from .validator import ValidationResult, Validator
+
+# Resolved once — called for every stream-json line
+_JLOADS = _orjson.loads if _orjson else json.loads
+
+# signal.signal() is only allowed here; SessionLoop is also built in dashboard worker threads
+_MAIN_THREAD_ID = threading.main_thread().ident
+
+# Claude CLI emits "type" as the first key of every stream-json event
+_EVENT_TYPE_RE = re.compile(rb'\{\s*"type"\s*:\s*"(\w+)"')
+# Events we never display — skipped before paying for a full JSON parse
+_SKIP_EVENT_TYPES = frozenset({"system", "user"})
+_SKIP_EVENT_TAGS = frozenset(t.encode() for t in _SKIP_EVENT_TYPES)
+# Assistant lines at least this large (Write/Edit payloads) are peeked, not parsed
+_LAZY_PARSE_MIN = 64 * 1024
+# First content block of the message is a tool_use
+_FIRST_TOOL_USE_RE = re.compile(rb'"content"\s*:\s*\[\s*\{\s*"type"\s*:\s*"tool_use"')
+# Assistant message id — the CLI emits one assistant line per content block,
+# all sharing their message's id; serialized right at the start of the message
+_MESSAGE_ID_RE = re.compile(rb'"id"\s*:\s*"(msg_\w+)"')
+_TOOL_NAME_RE = re.compile(rb'"name"\s*:\s*"(\w+)"')
+# Quotes inside JSON strings are escaped, so an unescaped "key" is a real key
+_TOOL_TARGET_RES = {
+    key: re.compile(rb'"%s"\s*:\s*"((?:[^"\\]|\\.)*)"' % key.encode())
+    for key in ("file_path", "pattern", "command")
+}
+# Tools without side effects — a turn's consecutive calls to these run concurrently
+_READ_ONLY_TOOLS = frozenset({"Read", "Glob", "Grep"})
+# Grep tool: subtrees the agent never wants searched (pruned during the walk)
+_GREP_EXCLUDE_DIRS = (".git", "node_modules", "__pycache__", ".venv", ".a1")
+# Grep tool: a pattern without these is searched as a literal (rg -F)
+_REGEX_META_RE = re.compile(r"[.^$*+?()\[\]{}|\\]")
+# Unread flag as written to queue.json by the dashboard
+_UNREAD_FLAG_RE = re.compile(rb'"read"\s*:\s*false')
+
+
+def _path_or_pattern(tool_input: dict) -> str:
+    return tool_input.get("file_path") or tool_input.get("pattern") or ""
+
+
+@lru_cache(maxsize=64)
+def _glob_regex(pattern: str) -> "re.Pattern":
+    """Compile a relative glob pattern with glob.glob(recursive=True) semantics.
+
+    * and ? stay within one path segment, ** spans any number of directories,
+    and wildcards don't match names starting with a dot.
+    """
+    segs = pattern.split("/")
+    out = ""
+    for n, seg in enumerate(segs):
+        last = n == len(segs) - 1
+        if seg == "**":
+            out += r"[^/.][^/]*(?:/[^/.][^/]*)*" if last else r"(?:[^/.][^/]*/)*"
+            continue
+        if not seg.startswith("."):
+            out += r"(?!\.)"
+        i = 0
+        while i < len(seg):
+            c = seg[i]
+            if c == "*":
+                out += r"[^/]*"
+            elif c == "?":
+                out += r"[^/]"
+            elif c == "[":
+                j = i + 1
+                if seg[j:j + 1] == "!":
+                    j += 1
+                if seg[j:j + 1] == "]":
+                    j += 1
+                end = seg.find("]", j)
+                if end < 0:
+                    out += r"\["
+                else:
+                    body = seg[i + 1:end]
+                    if body.startswith("!"):
+                        body = "^" + body[1:]
+                    out += "[" + body.replace("\\", "\\\\") + "]"
+                    i = end
+            else:
+                out += re.escape(c)
+            i += 1
+        if not last:
+            out += "/"
+    return re.compile(out + r"\Z")
+
+
+_GLOB_MAGIC_RE = re.compile(r"[*?[]")
+
+
+def _split_glob_root(pattern: str):
+    """Split "/abs/dir/**/*.py" into its literal root and relative rest ("/abs/dir", "**/*.py")"""
+    segs = pattern.split("/")
+    n = 1
+    while n < len(segs) - 1 and not _GLOB_MAGIC_RE.search(segs[n]):
+        n += 1
+    return "/".join(segs[:n]) or "/", "/".join(segs[n:])
+
+
+def _iglob_scandir(base: str, pattern: str):
+    """Yield paths under base (relative, "/"-separated) matching a glob pattern.
+
+    Walks with os.scandir — no per-entry stat — and, for patterns without **,
+    never deeper than the pattern itself. _GREP_EXCLUDE_DIRS are still listed
+    but only descended into where the pattern names them literally
+    (".a1/*.json", "node_modules/**/*.js"), not through a wildcard.
+    """
+    dirs_only = pattern.endswith("/")  # "src/*/" — directories, listed with the slash
+    pattern = pattern.rstrip("/")
+    regex = _glob_regex(pattern)
+    segs = pattern.split("/")
+    # Segments before the first ** sit at a fixed depth — a literal one there
+    # is the only way into an excluded directory
+    fixed = segs.index("**") if "**" in segs else len(segs)
+    # glob.glob lists "src/" itself for "src/**"
+    self_regex = _glob_regex(pattern[:-3]) if pattern.endswith("/**") else None
+    max_depth = None if fixed < len(segs) else len(segs) - 1
+    stack = [("", 0)]
+    while stack:
+        rel_dir, depth = stack.pop()
+        try:
+            it = os.scandir(os.path.join(base, rel_dir) if rel_dir else base)
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                rel = rel_dir + entry.name
+                if regex.match(rel):
+                    if not dirs_only:
+                        yield rel
+                    elif entry.is_dir():
+                        yield rel + "/"
+                if self_regex is not None and self_regex.match(rel) and entry.is_dir():
+                    yield rel + "/"
+                if max_depth is not None and depth >= max_depth:
+                    continue
+                if entry.name in _GREP_EXCLUDE_DIRS and not (depth < fixed and segs[depth] == entry.name):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((rel + "/", depth + 1))
+
+
+def _fadvise_willneed(paths) -> None:
+    for p in paths:
+        try:
+            fd = os.open(p, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
+
+
+# tool_name -> (event_type, tool_input -> display target)
+_TOOL_DISPATCH = {
+    "Read": ("read", _path_or_pattern),
+    "Glob": ("read", _path_or_pattern),
+    "Grep": ("read", _path_or_pattern),
+    "Edit": ("edit", lambda ti: ti.get("file_path", "")),
+    "Write": ("write", lambda ti: ti.get("file_path", "")),
+    "Bash": ("bash", lambda ti: ti.get("command", "")[:80]),
+}
+
+
+@dataclass(**DATACLASS_SLOTS)
+class SessionMetrics:
+    """Live per-session counters (attribute access on the hot stream path)"""
+    tokens_in: int = 0
+    tokens_out: int = 0
+    cache_read: int = 0
+    cache_creation: int = 0
+    tools_used: int = 0
+    turns: int = 0  # model turns — what --max-turns counts (one can hold several tool calls)
+    session_start: Optional[float] = None
+    session_duration: int = 0
+    context_percent: float = 0.0
+    token_reservation: int = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "tokens_in": self.tokens_in,
+            "tokens_out": self.tokens_out,
+            "cache_read": self.cache_read,
+            "cache_creation": self.cache_creation,
+            "tools_used": self.tools_used,
+            "turns": self.turns,
+            "session_start": self.session_start,
+            "session_duration": self.session_duration,
+            "context_percent": self.context_percent,
+            "token_reservation": self.token_reservation,
+        }
+
+
+class _LogBatcher:
+    """Coalesce log callback events — flush at max_size events or after max_wait seconds.
+
+    If bulk_callback is set it receives the whole list of (text, event_type)
+    pairs at once, otherwise callback is called per event.
+    """
+
+    def __init__(self, callback, bulk_callback=None, max_size: int = 32, max_wait: float = 0.2):
+        self.callback = callback
+        self.bulk_callback = bulk_callback
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    def add(self, text: str, event_type: str) -> None:
+        with self._lock:
+            self._pending.append((text, event_type))
+            if len(self._pending) < self.max_size:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.max_wait, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+
+    def flush(self) -> None:
+        # Deliver under the lock so a timer flush can't reorder events
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._pending:
+                return
+            events = list(self._pending)
+            self._pending.clear()
+            try:
+                if self.bulk_callback:
+                    self.bulk_callback(events)
+                else:
+                    for text, event_type in events:
+                        self.callback(text, event_type)
+            except Exception:
+                pass
+
+
+class _PersistentShell:
+    """Long-lived bash for the Bash tool — one fork/exec per session, not per call.
+
+    Commands run in the shell itself (so cd/export carry over between calls,
+    like a terminal) with stdin from /dev/null. Completion is detected by a
+    per-call sentinel line that also carries the exit code.
+    """
+
+    def __init__(self, cwd: str):
+        self.proc = subprocess.Popen(
+            ["/bin/bash", "--noprofile", "--norc"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            cwd=cwd,
+        )
+
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def run(self, cmd: str, timeout: float, max_bytes: int = 1 << 20):
+        """Run cmd, return (output, exit_code). Raises subprocess.TimeoutExpired.
+
+        Keeps at most max_bytes of output; the rest is drained and dropped
+        (only a small tail is kept to spot the sentinel).
+        """
+        marker = f"__A1_END_{uuid.uuid4().hex}__".encode()
+        # One single-quoted eval argument: an unbalanced quote or brace in cmd
+        # is a syntax error from eval right away, not bash waiting for more input
+        quoted = b"'" + cmd.encode("utf-8").replace(b"'", b"'\\''") + b"'"
+        self.proc.stdin.write(
+            b"eval " + quoted + b" < /dev/null\n"
+            b"printf '\\n%s %d\\n' " + marker + b" $?\n"
+        )
+        self.proc.stdin.flush()
+
+        fd = self.proc.stdout.fileno()
+        buf = bytearray()
+        keep_tail = 4096  # the sentinel always arrives within the last read's tail
+        truncated = False
+        deadline = time.monotonic() + timeout
+        while True:
+            idx = buf.find(marker)
+            if idx >= 0 and buf.find(b"\n", idx) >= 0:
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.close()
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:  # the command ended the shell (exit, syntax error)
+                self.close()
+                return buf[:max_bytes].decode("utf-8", "replace"), self.proc.returncode
+            buf += chunk
+            if len(buf) > max_bytes + keep_tail:
+                del buf[max_bytes:len(buf) - keep_tail]
+                truncated = True
+
+        end = buf.find(b"\n", idx)
+        exit_code = int(buf[idx + len(marker):end])
+        out = buf[:max_bytes] if truncated else buf[:idx]
+        if out.endswith(b"\n"):  # the sentinel's own leading newline
+            out = out[:-1]
+        return out.decode("utf-8", "replace"), exit_code
+
+    def close(self) -> None:
+        if self.alive():
+            self.proc.kill()
+        self.proc.wait()
+        for pipe in (self.proc.stdin, self.proc.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
 
 
 class SessionLoop:
@@ -21,6 +355,15 @@ class SessionLoop:
     CONTEXT_WINDOW_SIZE = 200_000
     # Auto-checkpoint threshold (70% of context window)
     CONTEXT_THRESHOLD = 0.70
+    # Smoothing factor for the tokens-per-turn estimate in .a1/token_stats.json
+    TOKEN_EWMA_ALPHA = 0.3
+    # Glob/Grep: how many hit files to prefetch into the page cache
+    PREFETCH_FILES = 16
+    # Bash tool: max output chars returned to the model
+    BASH_OUTPUT_LIMIT = 10000
+    # [Tokens] dashboard updates: at most one per interval unless context moved by delta
+    METRIC_EMIT_INTERVAL = 1.0
+    METRIC_EMIT_DELTA = 0.05
 
     def __init__(
         self,
@@ -51,46 +394,76 @@ class SessionLoop:
         self._running = False
         self._current_process: Optional[subprocess.Popen] = None
         self._log_callback = None  # Callback for live log streaming
+        self._log_callback_bulk = None  # Optional: receives a list of (text, type) per flush
+        self._log_batch: Optional[_LogBatcher] = None
+        self._console_pending = []  # Stream display lines awaiting one batched stdout write
         self._last_verification = None  # Last verification result
         self._context_overflow = False  # Set when context >= threshold
+        self._last_message_id: Optional[bytes] = None  # see _count_turn
         self._context_percent = 0.0  # Current context usage (0.0 - 1.0)
-        self._session_metrics = {
-            "tokens_in": 0,
-            "tokens_out": 0,
-            "cache_read": 0,
-            "cache_creation": 0,
-            "tools_used": 0,
-            "session_start": None,
-            "session_duration": 0,
-            "context_percent": 0.0,
-        }
+        self._last_metric_emit = 0.0  # monotonic time of the last [Tokens] update
+        self._last_metric_pct = -1.0  # context percent at that update
+        self._session_metrics = SessionMetrics()
+        self._rg_path = shutil.which("rg")  # Grep tool prefers ripgrep when installed
+        self._shell: Optional[_PersistentShell] = None  # Bash tool co-process (API provider)
+        self._anthropic_client = None  # Reused across sessions (keep-alive connections)
+        self._anthropic_key: Optional[str] = None
+        self._log_dir_ready = False  # .a1/sessions created (once per loop)
         self._setup_signal_handlers()
 
     def _setup_signal_handlers(self):
         """Настроить обработку Ctrl+C (only works in main thread)"""
-        import threading
-        if threading.current_thread() is threading.main_thread():
-            signal.signal(signal.SIGINT, self._handle_interrupt)
-            signal.signal(signal.SIGTERM, self._handle_interrupt)
+        if threading.get_ident() != _MAIN_THREAD_ID:
+            return
+        # Bound methods compare equal (not identical) across attribute lookups
+        if signal.getsignal(signal.SIGINT) == self._handle_interrupt:
+            return
+        signal.signal(signal.SIGINT, self._handle_interrupt)
+        signal.signal(signal.SIGTERM, self._handle_interrupt)
 
     def _handle_interrupt(self, signum, frame):
         """Обработать прерывание"""
         print("\n\n[!]  Interrupt received. Saving checkpoint...")
         self._running = False
+        self._flush_log()
         if self._current_process:
             self._current_process.terminate()
 
     def stop(self):
         """Остановить loop извне (из dashboard)"""
         self._running = False
-        if self._current_process:
-            self._current_process.terminate()
+        self._flush_log()
+        proc = self._current_process  # read once — the loop thread may reset it
+        if proc:
+            proc.terminate()
+
+    def _emit(self, text: str, event_type: str, urgent: bool = False) -> None:
+        """Queue an event for the live log callback (batched, see _LogBatcher)"""
+        if not self._log_callback:
+            return
+        if self._log_batch is None:
+            self._log_batch = _LogBatcher(self._log_callback, self._log_callback_bulk)
+        self._log_batch.add(text, event_type)
+        if urgent:
+            self._log_batch.flush()
+
+    def _flush_log(self) -> None:
+        """Deliver any batched log events now"""
+        if self._log_batch is not None:
+            self._log_batch.flush()
+
+    def _flush_console(self) -> None:
+        """Write pending stream display lines to stdout in a single call"""
+        if self._console_pending:
+            sys.stdout.write("\n".join(self._console_pending) + "\n")
+            sys.stdout.flush()
+            self._console_pending.clear()
 
     def get_session_metrics(self) -> dict:
         """Return current session metrics for dashboard"""
-        metrics = dict(self._session_metrics)
+        metrics = self._session_metrics.as_dict()
         # Live duration update
-        if metrics.get("session_start") and self._running:
+        if metrics["session_start"] and self._running:
             metrics["session_duration"] = int(time.time() - metrics["session_start"])
         metrics["context_percent"] = self._context_percent
         metrics["context_overflow"] = self._context_overflow
@@ -98,22 +471,14 @@ class SessionLoop:
 
     def _classify_tool(self, tool_name: str, tool_input: dict):
         """Classify a tool_use block into (display_text, event_type)"""
-        type_map = {"Read": "read", "Edit": "edit", "Write": "write",
-                    "Bash": "bash", "Glob": "read", "Grep": "read"}
-        ev_type = type_map.get(tool_name, "bash")
-        if tool_name in ("Read", "Glob", "Grep"):
-            target = tool_input.get("file_path") or tool_input.get("pattern") or ""
-            return f"[{tool_name}] {target}", ev_type
-        elif tool_name in ("Edit", "Write"):
-            target = tool_input.get("file_path", "")
-            return f"[{tool_name}] {target}", ev_type
-        elif tool_name == "Bash":
-            cmd = tool_input.get("command", "")[:80]
-            return f"[Bash] {cmd}", ev_type
-        return f"[{tool_name}]", ev_type
-
-    def _parse_stream_event(self, line: str):
-        """Parse a stream-json NDJSON line into (display_text, event_type)
+        entry = _TOOL_DISPATCH.get(tool_name)
+        if entry is None:
+            return f"[{tool_name}]", "bash"
+        ev_type, target = entry
+        return f"[{tool_name}] {target(tool_input)}", ev_type
+
+    def _parse_stream_event(self, line: bytes):
+        """Parse a raw stream-json NDJSON line into (display_text, event_type)
 
         With -p --verbose --output-format stream-json, Claude CLI outputs:
         - {"type":"system","subtype":"init",...}
@@ -124,99 +489,152 @@ class SessionLoop:
         - {"type":"result","result":"..."}
         - {"type":"rate_limit_event",...} (skip)
         """
-        import json as _json
         stripped = line.strip()
         if not stripped:
             return None, None
+        # user events carry whole tool_result payloads — don't parse them just to drop them
+        head = _EVENT_TYPE_RE.match(stripped)
+        if head and head.group(1) in _SKIP_EVENT_TAGS:
+            return None, None
+        if head and head.group(1) == b"assistant":
+            self._count_turn(stripped)
+        if head and head.group(1) == b"assistant" and len(stripped) >= _LAZY_PARSE_MIN:
+            shown = self._peek_tool_use(stripped)
+            if shown is not None:
+                return shown
         try:
-            event = _json.loads(stripped)
-        except (_json.JSONDecodeError, ValueError):
-            return stripped, "text"
+            # orjson is a drop-in C parser; both raise ValueError subclasses and take bytes
+            event = _JLOADS(stripped)
+        except ValueError:
+            return stripped.decode("utf-8", "replace"), "text"
 
-        etype = event.get("type", "")
-
-        # Skip non-useful events
-        if etype in ("system", "user"):
+        handler = self._EVENT_HANDLERS.get(event.get("type", ""))
+        if handler is None:  # system/user and unknown events
             return None, None
+        return handler(self, event)
 
-        # Parse rate_limit_event for token metrics + context monitoring
-        if etype == "rate_limit_event":
-            usage = event.get("usage", {})
-            if usage:
-                self._session_metrics["tokens_in"] = usage.get("input_tokens", self._session_metrics["tokens_in"])
-                self._session_metrics["tokens_out"] = usage.get("output_tokens", self._session_metrics["tokens_out"])
-                self._session_metrics["cache_read"] = usage.get("cache_read_input_tokens", self._session_metrics["cache_read"])
-                self._session_metrics["cache_creation"] = usage.get("cache_creation_input_tokens", self._session_metrics["cache_creation"])
-
-                # Context monitoring: input_tokens = current context usage
-                input_tokens = self._session_metrics["tokens_in"]
-                self._context_percent = input_tokens / self.CONTEXT_WINDOW_SIZE
-                self._session_metrics["context_percent"] = self._context_percent
-
-                # Check threshold — trigger auto-checkpoint
-                if self._context_percent >= self.CONTEXT_THRESHOLD and not self._context_overflow:
-                    self._context_overflow = True
-                    pct = int(self._context_percent * 100)
-                    print(f"\n  [CONTEXT] {pct}% used ({input_tokens:,}/{self.CONTEXT_WINDOW_SIZE:,}) — threshold reached, saving checkpoint...")
-                    if self._log_callback:
-                        try:
-                            self._log_callback(
-                                f"[Context] {pct}% — threshold reached, ending session",
-                                "verify"
-                            )
-                        except Exception:
-                            pass
-
-                # Emit metric update to dashboard
-                if self._log_callback:
-                    total = self._session_metrics["tokens_in"] + self._session_metrics["tokens_out"]
-                    pct = int(self._context_percent * 100)
-                    try:
-                        self._log_callback(
-                            f"[Tokens] {self._session_metrics['tokens_in']:,} in / {self._session_metrics['tokens_out']:,} out (total: {total:,}, context: {pct}%)",
-                            "metric"
-                        )
-                    except Exception:
-                        pass
-            return None, None
+    def _count_turn(self, line: bytes) -> None:
+        """Count a model turn at the first line of each assistant message"""
+        m = _MESSAGE_ID_RE.search(line, 0, 512)
+        if m is not None and m.group(1) != self._last_message_id:
+            self._last_message_id = m.group(1)
+            self._session_metrics.turns += 1
 
-        # Result message
-        if etype == "result":
-            result_text = str(event.get("result", ""))[:200]
-            if result_text.strip():
-                return f"[Result] {result_text}", "text"
-            return None, None
+    def _peek_tool_use(self, line: bytes):
+        """Classify a huge assistant line from its bytes when it starts with a tool_use.
 
-        # Assistant message — contains text, tool_use, or thinking blocks
-        if etype == "assistant":
-            msg = event.get("message", {})
-            content = msg.get("content", [])
-            for block in content:
-                btype = block.get("type", "")
-
-                # Tool use — Read, Edit, Write, Bash, etc.
-                if btype == "tool_use":
-                    self._session_metrics["tools_used"] += 1
-                    tool_name = block.get("name", "unknown")
-                    tool_input = block.get("input", {})
-                    return self._classify_tool(tool_name, tool_input)
-
-                # Text output
-                if btype == "text":
-                    text = block.get("text", "")[:150]
-                    if text.strip():
-                        return text.strip(), "text"
+        Only the tool name and its display target are decoded — the (possibly
+        multi-MB) rest of the input is never materialized. Returns None when
+        the line doesn't fit that shape; the caller then parses it normally.
+        """
+        block = _FIRST_TOOL_USE_RE.search(line)
+        if block is None:
+            return None
+        name = _TOOL_NAME_RE.search(line, block.end())
+        if name is None:
+            return None
+        tool_input = {}
+        for key, key_re in _TOOL_TARGET_RES.items():
+            m = key_re.search(line, name.end())
+            if m:
+                try:
+                    tool_input[key] = _JLOADS(b'"' + m.group(1) + b'"')
+                except ValueError:
+                    return None
+        self._session_metrics.tools_used += 1
+        return self._classify_tool(name.group(1).decode(), tool_input)
+
+    def _on_rate_limit_event(self, event: dict):
+        """Parse rate_limit_event for token metrics + context monitoring"""
+        usage = event.get("usage", {})
+        if usage:
+            self._session_metrics.tokens_in = usage.get("input_tokens", self._session_metrics.tokens_in)
+            self._session_metrics.tokens_out = usage.get("output_tokens", self._session_metrics.tokens_out)
+            self._session_metrics.cache_read = usage.get("cache_read_input_tokens", self._session_metrics.cache_read)
+            self._session_metrics.cache_creation = usage.get("cache_creation_input_tokens", self._session_metrics.cache_creation)
+
+            # Context monitoring: input_tokens = current context usage
+            input_tokens = self._session_metrics.tokens_in
+            self._context_percent = input_tokens / self.CONTEXT_WINDOW_SIZE
+            self._session_metrics.context_percent = self._context_percent
+
+            # Check threshold — trigger auto-checkpoint
+            crossed = self._context_percent >= self.CONTEXT_THRESHOLD and not self._context_overflow
+            if crossed:
+                self._context_overflow = True
+                pct = int(self._context_percent * 100)
+                self._flush_console()
+                print(f"\n  [CONTEXT] {pct}% used ({input_tokens:,}/{self.CONTEXT_WINDOW_SIZE:,}) — threshold reached, saving checkpoint...")
+                self._emit(f"[Context] {pct}% — threshold reached, ending session", "verify", urgent=True)
+
+            # Emit metric update to dashboard (throttled — these can arrive many times a second)
+            if self._log_callback and self._metric_due(force=crossed):
+                total = self._session_metrics.tokens_in + self._session_metrics.tokens_out
+                pct = int(self._context_percent * 100)
+                self._emit(
+                    f"[Tokens] {self._session_metrics.tokens_in:,} in / {self._session_metrics.tokens_out:,} out (total: {total:,}, context: {pct}%)",
+                    "metric"
+                )
+        return None, None
 
-                # Thinking (extended thinking)
-                if btype == "thinking":
-                    thinking = block.get("thinking", "")[:100]
-                    if thinking.strip():
-                        return thinking.strip(), "thinking"
+    def _metric_due(self, force: bool = False) -> bool:
+        """True if a [Tokens] update should go out now (and record it as sent)"""
+        now = time.monotonic()
+        if (not force
+                and now - self._last_metric_emit < self.METRIC_EMIT_INTERVAL
+                and abs(self._context_percent - self._last_metric_pct) < self.METRIC_EMIT_DELTA):
+            return False
+        self._last_metric_emit = now
+        self._last_metric_pct = self._context_percent
+        return True
 
-            return None, None
+    def _on_result_event(self, event: dict):
+        """Result message (its num_turns is the CLI's own turn count)"""
+        num_turns = event.get("num_turns")
+        if isinstance(num_turns, int):
+            self._session_metrics.turns = num_turns
+        result_text = str(event.get("result", ""))[:200]
+        if result_text.strip():
+            return f"[Result] {result_text}", "text"
+        return None, None
 
+    def _on_assistant_event(self, event: dict):
+        """Assistant message — first displayable text, tool_use, or thinking block"""
+        for block in event.get("message", {}).get("content", []):
+            handler = self._BLOCK_HANDLERS.get(block.get("type", ""))
+            if handler is not None:
+                shown = handler(self, block)
+                if shown is not None:
+                    return shown
         return None, None
 
+    def _on_tool_use_block(self, block: dict):
+        """Tool use — Read, Edit, Write, Bash, etc."""
+        self._session_metrics.tools_used += 1
+        return self._classify_tool(block.get("name", "unknown"), block.get("input", {}))
+
+    def _on_text_block(self, block: dict):
+        text = block.get("text", "")[:150].strip()
+        return (text, "text") if text else None
+
+    def _on_thinking_block(self, block: dict):
+        """Thinking (extended thinking)"""
+        thinking = block.get("thinking", "")[:100].strip()
+        return (thinking, "thinking") if thinking else None
+
+    # etype -> handler(self, event); anything missing (system, user, ...) is skipped
+    _EVENT_HANDLERS = {
+        "rate_limit_event": _on_rate_limit_event,
+        "result": _on_result_event,
+        "assistant": _on_assistant_event,
+    }
+    # content block type -> handler(self, block), None means "try the next block"
+    _BLOCK_HANDLERS = {
+        "tool_use": _on_tool_use_block,
+        "text": _on_text_block,
+        "thinking": _on_thinking_block,
+    }
+
     # Checks that BLOCK completion (must fix)
     BLOCKING_CHECKS = {"syntax", "tests"}
     # Checks that WARN but don't block (nice to fix)
@@ -235,12 +653,53 @@ class SessionLoop:
         cp_data["context_percent"] = pct
         cp_data["status"] = "WORKING"
         decisions = cp_data.get("decisions", [])
-        decisions.append(f"Auto-checkpoint at {pct}% context ({self._session_metrics['tokens_in']:,} tokens)")
+        decisions.append(f"Auto-checkpoint at {pct}% context ({self._session_metrics.tokens_in:,} tokens)")
         cp_data["decisions"] = decisions[-20:]
         cp_data["last_action"] = f"Context overflow at {pct}% — session terminated for checkpoint"
-        cp_data["session_metrics"] = dict(self._session_metrics)
+        cp_data["session_metrics"] = self._session_metrics.as_dict()
         self.checkpoint.save(cp_data)
-        print(f"  [CONTEXT] Checkpoint saved (context: {pct}%, tokens: {self._session_metrics['tokens_in']:,})")
+        print(f"  [CONTEXT] Checkpoint saved (context: {pct}%, tokens: {self._session_metrics.tokens_in:,})")
+
+    def _reserve_turns(self) -> int:
+        """Reserve the session's context budget up front.
+
+        Caps max_turns so that turns x EWMA(tokens per turn) fits under
+        CONTEXT_THRESHOLD — the CLI then stops cleanly at --max-turns instead
+        of being killed mid-response on overflow. Returns the turn budget.
+        """
+        per_turn = 0.0
+        stats_file = self.project_dir / ".a1" / "token_stats.json"
+        try:
+            per_turn = float(json.loads(stats_file.read_text()).get("ewma_tokens_per_turn", 0))
+        except (OSError, ValueError, AttributeError):
+            pass
+
+        turns = self.max_turns
+        if per_turn > 0:
+            budget = self.CONTEXT_WINDOW_SIZE * self.CONTEXT_THRESHOLD
+            turns = max(1, min(self.max_turns, int(budget // per_turn)))
+            if turns < self.max_turns:
+                print(f"  [CONTEXT] Reserving {turns}/{self.max_turns} turns (~{int(per_turn):,} tokens/turn)")
+        self._session_metrics.token_reservation = int(turns * per_turn)
+        return turns
+
+    def _update_token_stats(self):
+        """Fold this session's tokens-per-turn into the EWMA used by _reserve_turns"""
+        turns = self._session_metrics.turns
+        tokens = self._session_metrics.tokens_in
+        if not turns or not tokens:
+            return
+        sample = tokens / turns
+        stats_file = self.project_dir / ".a1" / "token_stats.json"
+        try:
+            stats = json.loads(stats_file.read_text())
+        except (OSError, ValueError):
+            stats = {}
+        prev = stats.get("ewma_tokens_per_turn")
+        alpha = self.TOKEN_EWMA_ALPHA
+        stats["ewma_tokens_per_turn"] = sample if not prev else alpha * sample + (1 - alpha) * prev
+        stats["sessions"] = stats.get("sessions", 0) + 1
+        stats_file.write_text(json.dumps(stats, indent=2))
 
     def _capture_baseline(self):
         """Capture validation state BEFORE first session.
@@ -285,12 +744,31 @@ class SessionLoop:
         blocking_issues = []
         warnings = []
 
-        # 1. Run validator
-        print("  [VERIFY] Running validation checks...")
-        val_results = self.validator.run_all()
+        checkpoint = self.checkpoint.load()
+        files_modified = checkpoint.get("files_modified", [])
+        criteria_tasks = [t for t in self.tasks.get_tasks(status="done") if t.success_criteria]
 
+        # Validator, file and criteria checks don't depend on each other — run concurrently
+        print("  [VERIFY] Running validation checks...")
+        # One tree walk for the state every check below is keyed on
+        tree_key = self.validator.tree_key()
+        with ThreadPoolExecutor(max_workers=2 + len(criteria_tasks)) as pool:
+            val_future = pool.submit(self.validator.run_all, key=tree_key)
+            files_future = (
+                pool.submit(self.validator.check_files_exist, files_modified)
+                if files_modified else None
+            )
+            criteria_futures = [
+                (task, pool.submit(self.validator.check_criteria, task.success_criteria, tree_key))
+                for task in criteria_tasks
+            ]
+            val_results = val_future.result()
+            files_report = files_future.result() if files_future else None
+            criteria_reports = [(task, future.result()) for task, future in criteria_futures]
+
+        # 1. Validator results
         for name, report in val_results.items():
-            if report.result.value != "fail":
+            if report.result is not ValidationResult.FAIL:
                 continue
             # Skip pre-existing issues (baseline)
             if not self._is_new_issue(name, report):
@@ -305,20 +783,13 @@ class SessionLoop:
                 warnings.append(f"{name}: {report.message}")
 
         # 2. Check files_modified exist (BLOCKING)
-        checkpoint = self.checkpoint.load()
-        files_modified = checkpoint.get("files_modified", [])
-        if files_modified:
-            files_report = self.validator.check_files_exist(files_modified)
-            if files_report.result.value == "fail":
-                blocking_issues.append(f"files: {files_report.message}")
+        if files_report and files_report.result is ValidationResult.FAIL:
+            blocking_issues.append(f"files: {files_report.message}")
 
         # 3. Success criteria (BLOCKING)
-        done_tasks = self.tasks.get_tasks(status="done")
-        for task in done_tasks:
-            if task.success_criteria:
-                criteria_report = self.validator.check_criteria(task.success_criteria)
-                if criteria_report.result.value == "fail":
-                    blocking_issues.append(f"{task.id} criteria: {criteria_report.message}")
+        for task, criteria_report in criteria_reports:
+            if criteria_report.result is ValidationResult.FAIL:
+                blocking_issues.append(f"{task.id} criteria: {criteria_report.message}")
 
         # 4. All tasks done? (BLOCKING if checkpoint says COMPLETED)
         if checkpoint.get("status") == "COMPLETED":
@@ -346,7 +817,7 @@ class SessionLoop:
         if passed and not force_accept:
             summary_lines.append("[VERIFY] All checks PASSED")
             for name, report in val_results.items():
-                icon = "OK" if report.result.value == "ok" else "SKIP"
+                icon = "OK" if report.result is ValidationResult.OK else "SKIP"
                 summary_lines.append(f"  [{icon}] {name}: {report.message}")
         elif force_accept:
             summary_lines.append(f"[VERIFY] FORCE ACCEPTED after {retry_count} retries")
@@ -367,11 +838,8 @@ class SessionLoop:
 
         # Log callback for dashboard
         if self._log_callback:
-            try:
-                log_msg = f"[Verification] {'PASSED' if passed else f'FAILED ({retry_count}/{self.MAX_VERIFY_RETRIES}): ' + '; '.join(blocking_issues[:2])}"
-                self._log_callback(log_msg, "verify")
-            except Exception:
-                pass
+            log_msg = f"[Verification] {'PASSED' if passed else f'FAILED ({retry_count}/{self.MAX_VERIFY_RETRIES}): ' + '; '.join(blocking_issues[:2])}"
+            self._emit(log_msg, "verify", urgent=True)
 
         return {
             "passed": passed,
@@ -384,22 +852,33 @@ class SessionLoop:
 
     def _read_queue_messages(self) -> str:
         """Read unread messages from queue.json and mark them as read"""
-        import json
         queue_file = self.project_dir / ".a1" / "queue.json"
         if not queue_file.exists():
             return ""
         try:
-            data = json.loads(queue_file.read_text())
-        except (json.JSONDecodeError, IOError):
+            with open(queue_file, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # Fast path: the dashboard always writes an explicit flag, so no
+                # unread flag means nothing to do — skip the parse entirely
+                if _UNREAD_FLAG_RE.search(mm) is None:
+                    return ""
+                raw = mm[:]
+            data = _JLOADS(raw)
+        except (ValueError, IOError):  # ValueError also covers mmap of an empty file
             return ""
         unread = [m for m in data.get("messages", []) if not m.get("read")]
         if not unread:
             return ""
-        # Mark as read
-        for m in data["messages"]:
-            if not m.get("read"):
-                m["read"] = True
-        queue_file.write_text(json.dumps(data, indent=2, ensure_ascii=False))
+        # Mark as read — patch the flags in place instead of re-serializing the queue
+        patched, flipped = _UNREAD_FLAG_RE.subn(b'"read": true', raw)
+        if flipped != len(unread):
+            # Hand-edited file (missing/null flags) — fall back to a full rewrite
+            for m in data["messages"]:
+                if not m.get("read"):
+                    m["read"] = True
+            patched = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+        tmp_file = queue_file.with_name(queue_file.name + ".tmp")
+        tmp_file.write_bytes(patched)
+        os.replace(tmp_file, queue_file)
         lines = ["## USER MESSAGES (from queue)"]
         for m in unread:
             lines.append(f"- [{m.get('added_at', '?')}] {m['text']}")
@@ -436,15 +915,8 @@ class SessionLoop:
         lines.append("")
         return "\n".join(lines)
 
-    def build_prompt(self, is_first: bool = False) -> str:
-        """Build prompt for session (English prompts, respond in user's language)"""
-        checkpoint_summary = self.checkpoint.get_summary()
-        tasks_summary = self.tasks.get_summary()
-        queue_messages = self._read_queue_messages()
-        verification_prompt = self._get_verification_prompt()
-
-        if is_first:
-            prompt = f"""
+    # Static prompt bodies, formatted per session in build_prompt()
+    _FIRST_PROMPT_TEMPLATE = """
 AUTONOMOUS MODE ACTIVATED — Session #1
 
 ## LANGUAGE RULE
@@ -453,7 +925,7 @@ AUTONOMOUS MODE ACTIVATED — Session #1
 - Code comments in English
 
 ## PROJECT
-Working directory: {self.project_dir}
+Working directory: {project_dir}
 
 {tasks_summary}
 
@@ -501,9 +973,9 @@ Always work on the pending task with the LOWEST priority number first.
 Begin with the highest-priority pending task. Work autonomously.
 
 {verification_prompt}{queue_messages}"""
-        else:
-            prompt = f"""
-AUTONOMOUS MODE — Continuing Session #{self.checkpoint.get_session_number()}
+
+    _CONT_PROMPT_TEMPLATE = """
+AUTONOMOUS MODE — Continuing Session #{session_number}
 
 ## LANGUAGE RULE
 Respond in the language of user's request. Code comments in English.
@@ -531,39 +1003,177 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
 
 {verification_prompt}{queue_messages}Continue working.
 """
+
+    def _done_tasks_note(self) -> Optional[str]:
+        """Collapse note for completed tasks if they haven't changed since the last prompt.
+
+        Completed tasks are the part of the task list that only grows; once a
+        session has been shown them, later sessions get a one-line reference.
+        Hashes are kept in .a1/prompt_cache.json.
+        """
+        done = self.tasks.get_tasks(status="done")
+        if not done:
+            return None
+        block = "\n".join(f"{t.id}|{t.title}|{t.description}" for t in done)
+        digest = hashlib.blake2b(block.encode("utf-8"), digest_size=8).hexdigest()
+
+        cache_file = self.project_dir / ".a1" / "prompt_cache.json"
+        try:
+            cache = json.loads(cache_file.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            cache = {}
+        prev = cache.get("done_tasks", {})
+        if prev.get("hash") == digest:
+            return (f"[x] {len(done)} completed tasks — unchanged since session "
+                    f"#{prev.get('session', '?')} (details in .a1/tasks.json)")
+
+        cache["done_tasks"] = {"hash": digest, "session": self.checkpoint.get_session_number()}
+        cache_file.write_text(json.dumps(cache, indent=2), encoding="utf-8")
+        return None
+
+    def build_prompt(self, is_first: bool = False) -> str:
+        """Build prompt for session (English prompts, respond in user's language)"""
+        done_note = self._done_tasks_note()
+        tasks_summary = self.tasks.get_summary(done_note=None if is_first else done_note)
+        queue_messages = self._read_queue_messages()
+        verification_prompt = self._get_verification_prompt()
+
+        if is_first:
+            prompt = self._FIRST_PROMPT_TEMPLATE.format(
+                project_dir=self.project_dir,
+                tasks_summary=tasks_summary,
+                verification_prompt=verification_prompt,
+                queue_messages=queue_messages,
+            )
+        else:
+            prompt = self._CONT_PROMPT_TEMPLATE.format(
+                session_number=self.checkpoint.get_session_number(),
+                checkpoint_summary=self.checkpoint.get_summary(),
+                tasks_summary=tasks_summary,
+                verification_prompt=verification_prompt,
+                queue_messages=queue_messages,
+            )
         return prompt.strip()
 
     def run_session(self, prompt: str) -> int:
         """Запустить одну сессию Claude"""
-        if self.provider == "claude-max":
-            return self._run_claude_max(prompt)
-        elif self.provider == "claude-api":
-            return self._run_claude_api(prompt)
-        elif self.provider.startswith("ollama"):
-            return self._run_ollama(prompt)
-        else:
-            print(f"[ERROR] Unknown provider: {self.provider}")
-            return 1
+        try:
+            if self.provider == "claude-max":
+                return self._run_claude_max(prompt)
+            elif self.provider == "claude-api":
+                return self._run_claude_api(prompt)
+            elif self.provider.startswith("ollama"):
+                return self._run_ollama(prompt)
+            else:
+                print(f"[ERROR] Unknown provider: {self.provider}")
+                return 1
+        finally:
+            self._flush_console()
+            self._flush_log()
+            self._close_shell()
+
+    def _prefetch(self, paths: list) -> None:
+        """Ask the kernel to read files ahead in the background (fire-and-forget).
+
+        A Read/Edit of a Glob/Grep hit usually follows one model round-trip
+        later, by which time the file is in the page cache. Linux/POSIX only.
+        """
+        if paths and hasattr(os, "posix_fadvise"):
+            threading.Thread(target=_fadvise_willneed, args=(paths,), daemon=True).start()
+
+    def _session_log_file(self) -> Path:
+        """Path of the current session's log, creating .a1/sessions on first use"""
+        log_dir = self.project_dir / ".a1" / "sessions"
+        if not self._log_dir_ready:
+            log_dir.mkdir(parents=True, exist_ok=True)
+            self._log_dir_ready = True
+        return log_dir / f"session_{self.checkpoint.get_session_number():03d}.log"
+
+    def _get_shell(self) -> Optional[_PersistentShell]:
+        """Persistent shell for the Bash tool, (re)started on demand; None if unavailable"""
+        if self._shell is not None and self._shell.alive():
+            return self._shell
+        if os.name != "posix":
+            return None
+        try:
+            self._shell = _PersistentShell(str(self.project_dir))
+        except OSError:
+            self._shell = None
+        return self._shell
+
+    def _run_bash_once(self, cmd: str, timeout: float, max_bytes: int):
+        """One-shot shell command (no persistent shell): keep at most max_bytes of output
+
+        The rest is drained and discarded so the command still runs to
+        completion (pip/npm install must not be cut off halfway).
+        """
+        proc = subprocess.Popen(
+            cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+            cwd=str(self.project_dir),
+        )
+        timed_out = threading.Event()
+
+        def kill_on_timeout():
+            timed_out.set()
+            proc.kill()
+
+        killer = threading.Timer(timeout, kill_on_timeout)
+        killer.start()
+        try:
+            out = proc.stdout.read(max_bytes)
+            while proc.stdout.read1(65536):
+                pass
+            proc.stdout.close()
+            returncode = proc.wait()
+        finally:
+            killer.cancel()
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        return out.decode("utf-8", "replace"), returncode
+
+    def _close_shell(self) -> None:
+        if self._shell is not None:
+            self._shell.close()
+            self._shell = None
+
+    @staticmethod
+    def _iter_stream_batches(stream, log_f, chunk_size: int = 65536):
+        """Yield lists of complete lines (bytes, no newline) from a binary pipe.
+
+        Reads whatever is available with read1() instead of one readline()
+        per event, and tees the raw chunks to log_f as they arrive. Each
+        yielded list holds the lines completed by one read.
+        """
+        buf = bytearray()
+        while True:
+            chunk = stream.read1(chunk_size)
+            if not chunk:
+                break
+            log_f.write(chunk)
+            log_f.flush()
+            buf.extend(chunk)
+            lines = []
+            start = 0
+            while (nl := buf.find(b"\n", start)) >= 0:
+                lines.append(bytes(buf[start:nl]))
+                start = nl + 1
+            del buf[:start]
+            if lines:
+                yield lines
+        if buf:
+            yield [bytes(buf)]
 
     def _run_claude_max(self, prompt: str) -> int:
         """Запустить Claude Code CLI (Max subscription)"""
         # Reset session metrics and context state
         self._context_overflow = False
         self._context_percent = 0.0
-        self._session_metrics = {
-            "tokens_in": 0, "tokens_out": 0,
-            "cache_read": 0, "cache_creation": 0,
-            "tools_used": 0, "session_start": time.time(),
-            "session_duration": 0, "context_percent": 0.0,
-        }
-        session_num = self.checkpoint.get_session_number()
-        log_dir = self.project_dir / ".a1" / "sessions"
-        log_dir.mkdir(parents=True, exist_ok=True)
-        log_file = log_dir / f"session_{session_num:03d}.log"
+        self._session_metrics = SessionMetrics(session_start=time.time())
+        max_turns = self._reserve_turns()
+        log_file = self._session_log_file()
 
         try:
             # Clean env: remove CLAUDECODE to allow nested sessions
-            import os
             env = os.environ.copy()
             env.pop("CLAUDECODE", None)
 
@@ -571,57 +1181,57 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
                 ["claude", "-p", prompt,
                  "--dangerously-skip-permissions",
                  "--no-session-persistence",
-                 "--max-turns", str(self.max_turns),
+                 "--max-turns", str(max_turns),
                  "--verbose",
                  "--output-format", "stream-json"],
                 cwd=self.project_dir,
                 env=env,
                 stdout=subprocess.PIPE,
                 stderr=subprocess.STDOUT,
-                text=True,
-                bufsize=1,
+                bufsize=65536,
             )
 
-            output_lines = []
-            with open(log_file, "w") as f:
-                while True:
-                    line = self._current_process.stdout.readline()
-                    if not line and self._current_process.poll() is not None:
-                        break
-                    if not line:
-                        continue
-                    f.write(line)
-                    f.flush()
-                    output_lines.append(line)
-
-                    # Parse stream-json NDJSON events
-                    display_text, event_type = self._parse_stream_event(line)
-                    if display_text:
-                        print(display_text)
-                        if self._log_callback:
+            with open(log_file, "wb") as f:
+                for lines in self._iter_stream_batches(self._current_process.stdout, f):
+                    for line in lines:
+
+                        # Parse stream-json NDJSON events
+                        display_text, event_type = self._parse_stream_event(line)
+                        if display_text:
+                            self._console_pending.append(display_text)
+                            self._emit(display_text, event_type)
+
+                        # Context overflow — save checkpoint & terminate session
+                        if self._context_overflow and self._current_process.poll() is None:
+                            self._flush_console()
+                            pct = int(self._context_percent * 100)
+                            print(f"\n  [CONTEXT] Terminating session at {pct}% context usage")
+                            # Remaining output is discarded anyway — kill outright, don't drain the pipe
+                            proc = self._current_process
+                            try:
+                                proc.stdout.close()
+                                proc.kill()
+                            except ProcessLookupError:
+                                pass
                             try:
-                                self._log_callback(display_text, event_type)
-                            except Exception:
+                                proc.wait(timeout=2)
+                            except subprocess.TimeoutExpired:
                                 pass
+                            self._current_process = None
+                            self._save_context_checkpoint()
+                            if self._session_metrics.session_start:
+                                self._session_metrics.session_duration = int(time.time() - self._session_metrics.session_start)
+                            return 0  # Clean exit — not an error
 
-                    # Context overflow — save checkpoint & terminate session
-                    if self._context_overflow and self._current_process.poll() is None:
-                        pct = int(self._context_percent * 100)
-                        print(f"\n  [CONTEXT] Terminating session at {pct}% context usage")
-                        self._save_context_checkpoint()
-                        self._current_process.terminate()
-                        self._current_process.wait(timeout=10)
-                        self._current_process = None
-                        if self._session_metrics.get("session_start"):
-                            self._session_metrics["session_duration"] = int(time.time() - self._session_metrics["session_start"])
-                        return 0  # Clean exit — not an error
+                    # Pipe drained — print this read's events in one write before blocking again
+                    self._flush_console()
 
             self._current_process.wait()
             returncode = self._current_process.returncode
             self._current_process = None
             # Record session duration
-            if self._session_metrics.get("session_start"):
-                self._session_metrics["session_duration"] = int(time.time() - self._session_metrics["session_start"])
+            if self._session_metrics.session_start:
+                self._session_metrics.session_duration = int(time.time() - self._session_metrics.session_start)
             return returncode
 
         except FileNotFoundError:
@@ -715,7 +1325,6 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
 
     def _execute_tool(self, name: str, input_data: dict) -> str:
         """Execute a tool and return the result as string."""
-        import glob as _glob
 
         try:
             if name == "Read":
@@ -730,42 +1339,97 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
 
             elif name == "Edit":
                 fpath = Path(input_data["file_path"])
-                content = fpath.read_text(encoding="utf-8")
-                old = input_data["old_string"]
-                new = input_data["new_string"]
-                count = content.count(old)
-                if count == 0:
+                with open(fpath, "rb") as f:
+                    raw = f.read()
+                # Search and splice the UTF-8 bytes directly — UTF-8 is self-synchronizing,
+                # so byte matches line up with str matches and no decode pass is needed
+                old = input_data["old_string"].encode("utf-8")
+                new = input_data["new_string"].encode("utf-8")
+                idx = raw.find(old)
+                if idx < 0:
                     return f"ERROR: old_string not found in {fpath}"
-                if count > 1:
+                if raw.find(old, idx + len(old)) != -1:
+                    # Only the error path pays for a full count
+                    count = raw.decode("utf-8", "replace").count(input_data["old_string"])
                     return f"ERROR: old_string found {count} times in {fpath} (must be unique)"
-                content = content.replace(old, new, 1)
-                fpath.write_text(content, encoding="utf-8")
+                view = memoryview(raw)  # write the untouched spans without copying them
+                with open(fpath, "wb") as f:
+                    f.write(view[:idx])
+                    f.write(new)
+                    f.write(view[idx + len(old):])
                 return f"Replaced in {fpath}"
 
             elif name == "Bash":
                 cmd = input_data["command"]
-                result = subprocess.run(
-                    cmd, shell=True, capture_output=True, text=True,
-                    timeout=120, cwd=str(self.project_dir),
-                )
-                output = result.stdout + result.stderr
-                return output[:10000] if output else f"(exit code: {result.returncode})"
+                # Never hold much more than the returned chars (<= 4 UTF-8 bytes each);
+                # anything cut off still decodes to more than BASH_OUTPUT_LIMIT chars
+                max_bytes = self.BASH_OUTPUT_LIMIT * 4 + 4
+                shell = self._get_shell()
+                if shell is not None:
+                    output, returncode = shell.run(cmd, timeout=120, max_bytes=max_bytes)
+                else:
+                    output, returncode = self._run_bash_once(cmd, timeout=120, max_bytes=max_bytes)
+                if not output:
+                    return f"(exit code: {returncode})"
+                if len(output) > self.BASH_OUTPUT_LIMIT:
+                    return output[:self.BASH_OUTPUT_LIMIT] + "\n...[truncated]"
+                return output
 
             elif name == "Glob":
                 pattern = input_data["pattern"]
                 base = input_data.get("path", str(self.project_dir))
-                matches = sorted(_glob.glob(pattern, root_dir=base, recursive=True))
-                return "\n".join(matches[:100]) if matches else "(no matches)"
+                # "./src/*.py": walk "src/*.py", list matches with the "./" like glob.glob
+                dot_prefix = ""
+                while pattern[len(dot_prefix):].startswith("./"):
+                    dot_prefix += "./"
+                rel = pattern[len(dot_prefix):]
+                segs = rel.split("/")
+                after_any = segs[segs.index("**") + 1:] if "**" in segs else []
+                if (".." in segs or "." in segs or os.sep != "/"
+                        # the walk never enters excluded dirs through **
+                        or any(seg in _GREP_EXCLUDE_DIRS for seg in after_any)):
+                    matches = sorted(glob.glob(pattern, root_dir=base, recursive=True))[:100]
+                elif os.path.isabs(pattern):
+                    # Walk from the literal root; matches are absolute, like glob.glob's
+                    root, rest = _split_glob_root(pattern)
+                    prefix = root.rstrip("/") + "/"
+                    matches = [prefix + m for m in heapq.nsmallest(100, _iglob_scandir(root, rest))]
+                else:
+                    # Sorted top 100 without materializing every match (pattern compiled once, cached)
+                    matches = [dot_prefix + m for m in heapq.nsmallest(100, _iglob_scandir(base, rel))]
+                self._prefetch([os.path.join(base, m) for m in matches[:self.PREFETCH_FILES]])
+                return "\n".join(matches) if matches else "(no matches)"
 
             elif name == "Grep":
                 pattern = input_data["pattern"]
                 path = input_data.get("path", str(self.project_dir))
-                result = subprocess.run(
-                    ["grep", "-rn", "--include=*.py", "--include=*.js",
-                     "--include=*.ts", "--include=*.json", "--include=*.md",
-                     pattern, path],
-                    capture_output=True, text=True, timeout=30,
-                )
+                if self._rg_path:
+                    cmd = [self._rg_path, "-n", "--no-heading", "--color=never",
+                           "--max-columns=200",
+                           "-tpy", "-tjs", "-tts", "-tjson", "-tmd",
+                           # parallel walk, capped so it doesn't starve the API/stream thread
+                           "-j", str(min(os.cpu_count() or 4, 8))]
+                    cmd += [f"--glob=!{d}" for d in _GREP_EXCLUDE_DIRS]
+                    if not _REGEX_META_RE.search(pattern):
+                        cmd.append("-F")
+                    cmd += ["-e", pattern, path]
+                else:
+                    cmd = ["grep", "-rn", "--include=*.py", "--include=*.js",
+                           "--include=*.ts", "--include=*.json", "--include=*.md"]
+                    cmd += [f"--exclude-dir={d}" for d in _GREP_EXCLUDE_DIRS]
+                    cmd += ["-e", pattern, path]
+                result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+                if result.returncode == 2 and not result.stdout and "-F" not in cmd and self._rg_path:
+                    # Not a valid Rust regex ("def run_all(") — grep's basic regex took
+                    # (, +, ?, { and | literally; search the text as typed
+                    cmd.insert(cmd.index("-e"), "-F")
+                    result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+                if result.returncode >= 2 and not result.stdout:
+                    return f"ERROR: {result.stderr.strip()[:2000] or f'exit code {result.returncode}'}"
+                if result.stdout:
+                    # "path:line:text" — first PREFETCH_FILES distinct paths
+                    hits = dict.fromkeys(ln.split(":", 1)[0] for ln in result.stdout.splitlines()[:500])
+                    self._prefetch(list(hits)[:self.PREFETCH_FILES])
                 return result.stdout[:10000] if result.stdout else "(no matches)"
 
             else:
@@ -774,13 +1438,55 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
         except Exception as e:
             return f"ERROR: {type(e).__name__}: {e}"
 
+    def _execute_tools(self, blocks) -> list:
+        """Execute a turn's tool_use blocks, returning results in block order.
+
+        Runs of consecutive read-only tools execute concurrently; Write/Edit/Bash
+        run one at a time in their original position (they may depend on each
+        other, and Bash shares one persistent shell).
+        """
+        results = [None] * len(blocks)
+        run = []  # indices of the current read-only run
+
+        def drain(pool):
+            futures = [(i, pool.submit(self._execute_tool, blocks[i].name, blocks[i].input)) for i in run]
+            for i, future in futures:
+                results[i] = future.result()
+            run.clear()
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            for i, block in enumerate(blocks):
+                if block.name in _READ_ONLY_TOOLS:
+                    run.append(i)
+                    continue
+                drain(pool)
+                results[i] = self._execute_tool(block.name, block.input)
+            drain(pool)
+        return results
+
+    def _get_anthropic_client(self, anthropic, api_key: str):
+        """Anthropic client shared by all sessions of this loop.
+
+        Keeps the connection pool (and its TLS sessions) alive between
+        sessions; uses HTTP/2 when the h2 package is installed.
+        """
+        if self._anthropic_client is None or self._anthropic_key != api_key:
+            http_client = None
+            try:
+                import h2  # noqa: F401 — httpx's optional HTTP/2 backend
+                http_client = anthropic.DefaultHttpxClient(http2=True)
+            except (ImportError, AttributeError):
+                pass
+            self._anthropic_client = anthropic.Anthropic(api_key=api_key, http_client=http_client)
+            self._anthropic_key = api_key
+        return self._anthropic_client
+
     def _run_claude_api(self, prompt: str) -> int:
         """Run session via Anthropic API [EXPERIMENTAL].
 
         Full agentic loop: send message → get response → execute tools → repeat.
         Requires anthropic SDK and API key.
         """
-        import os
 
         print()
         print("  [EXPERIMENTAL] Claude API provider — untested, may have issues")
@@ -804,21 +1510,15 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
         # Reset session metrics
         self._context_overflow = False
         self._context_percent = 0.0
-        self._session_metrics = {
-            "tokens_in": 0, "tokens_out": 0,
-            "cache_read": 0, "cache_creation": 0,
-            "tools_used": 0, "session_start": time.time(),
-            "session_duration": 0, "context_percent": 0.0,
-        }
+        self._session_metrics = SessionMetrics(session_start=time.time())
+
+        max_turns = self._reserve_turns()
 
         # Session log
-        session_num = self.checkpoint.get_session_number()
-        log_dir = self.project_dir / ".a1" / "sessions"
-        log_dir.mkdir(parents=True, exist_ok=True)
-        log_file = log_dir / f"session_{session_num:03d}.log"
+        log_file = self._session_log_file()
 
         model = self.model or "claude-sonnet-4-20250514"
-        client = anthropic.Anthropic(api_key=api_key)
+        client = self._get_anthropic_client(anthropic, api_key)
         tools = self._define_api_tools()
         messages = [{"role": "user", "content": prompt}]
 
@@ -828,12 +1528,14 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
         )
 
         try:
-            with open(log_file, "w") as f:
-                for turn in range(self.max_turns):
+            # Binary + large buffer: many tiny lines per turn, no TextIOWrapper per write
+            with open(log_file, "wb", buffering=131072) as f:
+                for turn in range(max_turns):
                     if not self._running:
                         break
 
-                    # API call with streaming
+                    # API call with streaming — each content block is shown as soon as
+                    # it completes instead of after the whole message
                     with client.messages.stream(
                         model=model,
                         max_tokens=8192,
@@ -841,57 +1543,50 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
                         tools=tools,
                         messages=messages,
                     ) as stream:
+                        for event in stream:
+                            if event.type != "content_block_stop":
+                                continue
+                            # content_block_stop only carries the block itself in newer
+                            # SDKs — the accumulated snapshot has it in every version
+                            block = stream.current_message_snapshot.content[event.index]
+                            if block.type == "text" and block.text.strip():
+                                text = block.text[:200]
+                                print(f"  {text}")
+                                f.write(f"[text] {text}\n".encode("utf-8"))
+                                self._emit(text, "text")
+
+                            elif block.type == "tool_use":
+                                self._session_metrics.tools_used += 1
+                                display, ev_type = self._classify_tool(block.name, block.input)
+                                print(f"  {display}")
+                                f.write(f"[tool] {display}\n".encode("utf-8"))
+                                self._emit(display, ev_type)
+                        # Already accumulated by the stream — only usage/stop_reason are new
                         response = stream.get_final_message()
+                    tool_use_blocks = [b for b in response.content if b.type == "tool_use"]
+                    self._session_metrics.turns += 1
 
                     # Update metrics from usage
                     if response.usage:
-                        self._session_metrics["tokens_in"] = response.usage.input_tokens
-                        self._session_metrics["tokens_out"] += response.usage.output_tokens
+                        self._session_metrics.tokens_in = response.usage.input_tokens
+                        self._session_metrics.tokens_out += response.usage.output_tokens
                         self._context_percent = response.usage.input_tokens / self.CONTEXT_WINDOW_SIZE
-                        self._session_metrics["context_percent"] = self._context_percent
+                        self._session_metrics.context_percent = self._context_percent
 
                     # Log to file
-                    import json as _json
-                    f.write(_json.dumps({"turn": turn, "stop_reason": response.stop_reason,
-                                         "usage": {"in": response.usage.input_tokens,
-                                                    "out": response.usage.output_tokens}}) + "\n")
-
-                    # Process content blocks
-                    tool_use_blocks = []
-                    for block in response.content:
-                        if block.type == "text" and block.text.strip():
-                            text = block.text[:200]
-                            print(f"  {text}")
-                            f.write(f"[text] {text}\n")
-                            if self._log_callback:
-                                try:
-                                    self._log_callback(text, "text")
-                                except Exception:
-                                    pass
-
-                        elif block.type == "tool_use":
-                            self._session_metrics["tools_used"] += 1
-                            display, ev_type = self._classify_tool(block.name, block.input)
-                            print(f"  {display}")
-                            f.write(f"[tool] {display}\n")
-                            if self._log_callback:
-                                try:
-                                    self._log_callback(display, ev_type)
-                                except Exception:
-                                    pass
-                            tool_use_blocks.append(block)
+                    record = {"turn": turn, "stop_reason": response.stop_reason,
+                              "usage": {"in": response.usage.input_tokens,
+                                        "out": response.usage.output_tokens}}
+                    f.write((_orjson.dumps(record) if _orjson else json.dumps(record).encode()) + b"\n")
 
                     # Emit metric update
                     if self._log_callback:
-                        total = self._session_metrics["tokens_in"] + self._session_metrics["tokens_out"]
+                        total = self._session_metrics.tokens_in + self._session_metrics.tokens_out
                         pct = int(self._context_percent * 100)
-                        try:
-                            self._log_callback(
-                                f"[Tokens] {self._session_metrics['tokens_in']:,} in / {self._session_metrics['tokens_out']:,} out (total: {total:,}, context: {pct}%)",
-                                "metric"
-                            )
-                        except Exception:
-                            pass
+                        self._emit(
+                            f"[Tokens] {self._session_metrics.tokens_in:,} in / {self._session_metrics.tokens_out:,} out (total: {total:,}, context: {pct}%)",
+                            "metric"
+                        )
 
                     # Context overflow check
                     if self._context_percent >= self.CONTEXT_THRESHOLD and not self._context_overflow:
@@ -906,23 +1601,12 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
                         break
 
                     # Execute tools and build tool_result messages
-                    assistant_content = []
-                    for block in response.content:
-                        if block.type == "text":
-                            assistant_content.append({"type": "text", "text": block.text})
-                        elif block.type == "tool_use":
-                            assistant_content.append({
-                                "type": "tool_use",
-                                "id": block.id,
-                                "name": block.name,
-                                "input": block.input,
-                            })
-                    messages.append({"role": "assistant", "content": assistant_content})
+                    # (the SDK's content blocks serialize back to request params as-is)
+                    messages.append({"role": "assistant", "content": response.content})
 
                     tool_results = []
-                    for block in tool_use_blocks:
-                        result_text = self._execute_tool(block.name, block.input)
-                        f.write(f"[result] {block.name}: {result_text[:200]}\n")
+                    for block, result_text in zip(tool_use_blocks, self._execute_tools(tool_use_blocks)):
+                        f.write(f"[result] {block.name}: {result_text[:200]}\n".encode("utf-8"))
                         tool_results.append({
                             "type": "tool_result",
                             "tool_use_id": block.id,
@@ -940,8 +1624,8 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
             print(f"[ERROR] Claude API: {type(e).__name__}: {e}")
             return 1
 
-        if self._session_metrics.get("session_start"):
-            self._session_metrics["session_duration"] = int(time.time() - self._session_metrics["session_start"])
+        if self._session_metrics.session_start:
+            self._session_metrics.session_duration = int(time.time() - self._session_metrics.session_start)
         return 0
 
     # ================================================================
@@ -968,17 +1652,9 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
         # Reset session metrics
         self._context_overflow = False
         self._context_percent = 0.0
-        self._session_metrics = {
-            "tokens_in": 0, "tokens_out": 0,
-            "cache_read": 0, "cache_creation": 0,
-            "tools_used": 0, "session_start": time.time(),
-            "session_duration": 0, "context_percent": 0.0,
-        }
+        self._session_metrics = SessionMetrics(session_start=time.time())
 
-        session_num = self.checkpoint.get_session_number()
-        log_dir = self.project_dir / ".a1" / "sessions"
-        log_dir.mkdir(parents=True, exist_ok=True)
-        log_file = log_dir / f"session_{session_num:03d}.log"
+        log_file = self._session_log_file()
 
         model = self.model or self.ollama_model
 
@@ -994,6 +1670,20 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
                     stream=True,
                 )
 
+                # Tokens arrive one at a time — write them out in ~50ms micro-batches
+                pending = []
+                pending_len = 0
+                last_flush = time.monotonic()
+
+                def flush_pending():
+                    text = "".join(pending)
+                    pending.clear()
+                    sys.stdout.write(text)
+                    sys.stdout.flush()
+                    f.write(text)
+                    if text.strip():
+                        self._emit(text.strip()[:150], "text")
+
                 for chunk in stream:
                     if not self._running:
                         break
@@ -1002,33 +1692,32 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
                     content = message.get("content", "")
                     if content:
                         full_response.append(content)
-                        print(content, end="", flush=True)
-                        f.write(content)
+                        pending.append(content)
+                        pending_len += len(content)
 
                     # Update metrics from Ollama response
                     if chunk.get("done"):
-                        self._session_metrics["tokens_in"] = chunk.get("prompt_eval_count", 0)
-                        self._session_metrics["tokens_out"] = chunk.get("eval_count", 0)
+                        self._session_metrics.tokens_in = chunk.get("prompt_eval_count", 0)
+                        self._session_metrics.tokens_out = chunk.get("eval_count", 0)
 
-                    if self._log_callback and content.strip():
-                        try:
-                            self._log_callback(content.strip()[:150], "text")
-                        except Exception:
-                            pass
+                    if pending and (pending_len > 512 or time.monotonic() - last_flush > 0.05):
+                        flush_pending()
+                        pending_len = 0
+                        last_flush = time.monotonic()
+
+                if pending:
+                    flush_pending()
 
             print()  # newline after streaming
 
             # Final log callback with full response summary
             response_text = "".join(full_response)
-            if self._log_callback and response_text.strip():
-                try:
-                    self._log_callback(
-                        f"[Ollama] Generated {len(response_text)} chars, "
-                        f"{self._session_metrics['tokens_in']} in / {self._session_metrics['tokens_out']} out",
-                        "metric"
-                    )
-                except Exception:
-                    pass
+            if response_text.strip():
+                self._emit(
+                    f"[Ollama] Generated {len(response_text)} chars, "
+                    f"{self._session_metrics.tokens_in} in / {self._session_metrics.tokens_out} out",
+                    "metric"
+                )
 
         except ConnectionError:
             print(f"[ERROR] Cannot connect to Ollama at {self.ollama_host}")
@@ -1038,8 +1727,8 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
             print(f"[ERROR] Ollama: {type(e).__name__}: {e}")
             return 1
 
-        if self._session_metrics.get("session_start"):
-            self._session_metrics["session_duration"] = int(time.time() - self._session_metrics["session_start"])
+        if self._session_metrics.session_start:
+            self._session_metrics.session_duration = int(time.time() - self._session_metrics.session_start)
         return 0
 
     def start(self) -> None:
@@ -1084,19 +1773,32 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
                 context_info = f", context: {int(self._context_percent * 100)}% [AUTO-CHECKPOINT]"
             print(f"-- Session #{cp['session']} ended (duration: {duration}s, exit: {exit_code}{context_info})")
 
-            # Save session metrics to checkpoint
-            self._session_metrics["session_duration"] = duration
+            # Session metrics — written together with the verification outcome below
+            self._session_metrics.session_duration = duration
+            self._update_token_stats()
             cp_data = self.checkpoint.load()
-            cp_data["session_metrics"] = dict(self._session_metrics)
+            cp_data["session_metrics"] = self._session_metrics.as_dict()
             cp_data["context_percent"] = int(self._context_percent * 100)
-            self.checkpoint.save(cp_data)
 
             # POST-SESSION VERIFICATION — don't trust agent, verify
             verification = self._verify_session()
             self._last_verification = verification
 
+            completed = cp_data.get("status") == "COMPLETED"
+            if completed and not verification["passed"]:
+                # Agent says COMPLETED but verification failed — reset for a retry
+                cp_data["status"] = "WORKING"
+                cp_data["last_verification"] = {
+                    "passed": False,
+                    "blocking_issues": verification["blocking_issues"],
+                    "warnings": verification["warnings"],
+                    "retry_count": verification["retry_count"],
+                    "session": cp_data.get("session", 0),
+                }
+            self.checkpoint.save(cp_data)
+
             # Проверяем статус (only trust COMPLETED if verification passed)
-            if self.checkpoint.is_completed():
+            if completed:
                 if verification["passed"]:
                     label = "FORCE ACCEPTED" if verification.get("force_accepted") else "VERIFIED"
                     print()
@@ -1115,16 +1817,6 @@ Edit .a1/checkpoint.json — set current_task, files_modified, decisions, last_a
                     print()
                     print(f"[!] Agent marked COMPLETED but verification FAILED (attempt {retry}/{self.MAX_VERIFY_RETRIES})")
                     print("    Resetting to WORKING — will retry in next session")
-                    cp_data = self.checkpoint.load()
-                    cp_data["status"] = "WORKING"
-                    cp_data["last_verification"] = {
-                        "passed": False,
-                        "blocking_issues": verification["blocking_issues"],
-                        "warnings": verification["warnings"],
-                        "retry_count": retry,
-                        "session": cp_data.get("session", 0),
-                    }
-                    self.checkpoint.save(cp_data)
 
             # Проверяем прерывание
             if exit_code == 130:  # Ctrl+C
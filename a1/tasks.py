@@ -3,12 +3,15 @@ Task Manager — управление задачами
 """
 
 import json
+import os
 from dataclasses import asdict, dataclass
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+from ._compat import orjson as _orjson
+
 
 class TaskStatus(Enum):
     PENDING = "pending"
@@ -41,6 +44,14 @@ class Task:
         return cls(**filtered)
 
 
+_STATUS_MARKS = {"pending": "[ ]", "in_progress": "[~]", "done": "[x]", "blocked": "[!]"}
+
+
+def _summary_order(t: Dict[str, Any]) -> Tuple[bool, int]:
+    """Open tasks first, then by priority"""
+    return (t.get("status", "pending") == "done", t.get("priority", 0))
+
+
 class TaskManager:
     """Управление задачами для автономной работы"""
 
@@ -49,17 +60,39 @@ class TaskManager:
         self.a1_dir = self.project_dir / ".a1"
         self.tasks_file = self.a1_dir / "tasks.json"
 
+        # Last loaded/saved data, valid while the file's (mtime_ns, size) match
+        self._cache: Optional[Dict[str, Any]] = None
+        self._cache_key: Optional[tuple] = None
+
         self.a1_dir.mkdir(parents=True, exist_ok=True)
 
+    def _file_key(self) -> Optional[tuple]:
+        """Cheap change detector for tasks.json (None if missing)"""
+        try:
+            st = os.stat(self.tasks_file)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
     def _load_data(self) -> Dict[str, Any]:
-        """Загрузить данные"""
-        if not self.tasks_file.exists():
+        """Загрузить данные
+
+        Returns the cached dict while tasks.json is unchanged on disk (the
+        agent edits it directly, so it is re-stat'ed on every call). Callers
+        that mutate the result must _save_data() it.
+        """
+        key = self._file_key()
+        if key is None:
+            self._cache = None
             return {"raw_thoughts": [], "tasks": [], "next_id": 1}
+        if self._cache is not None and key == self._cache_key:
+            return self._cache
 
         try:
-            with open(self.tasks_file, "r") as f:
-                data = json.load(f)
-        except (json.JSONDecodeError, IOError):
+            with open(self.tasks_file, "rb") as f:
+                raw = f.read()
+            data = _orjson.loads(raw) if _orjson else json.loads(raw)
+        except (ValueError, IOError):
             return {"raw_thoughts": [], "tasks": [], "next_id": 1}
 
         # Migrate: assign priorities if missing
@@ -70,13 +103,24 @@ class TaskManager:
                 needs_save = True
         if needs_save:
             self._save_data(data)
+        else:
+            self._cache, self._cache_key = data, key
 
         return data
 
     def _save_data(self, data: Dict[str, Any]) -> None:
         """Сохранить данные"""
-        with open(self.tasks_file, "w") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        # Indented either way — the agent reads and edits tasks.json directly
+        if _orjson:
+            payload = _orjson.dumps(data, option=_orjson.OPT_INDENT_2)
+        else:
+            payload = json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+        # atomic: readers (other handlers, the agent) never see a half-written file;
+        # per-process tmp name, since the agent and the dashboard both save
+        tmp_file = self.tasks_file.with_name(f"{self.tasks_file.name}.{os.getpid()}.tmp")
+        tmp_file.write_bytes(payload)
+        os.replace(tmp_file, self.tasks_file)
+        self._cache, self._cache_key = data, self._file_key()
 
     def add_raw_thought(self, thought: str) -> None:
         """Добавить сырую мысль (для последующей трансформации)"""
@@ -183,26 +227,36 @@ class TaskManager:
         done = len([t for t in tasks if t.status == "done"])
         return done, len(tasks)
 
-    def get_summary(self) -> str:
-        """Получить текстовое резюме для промпта"""
-        done, total = self.get_progress()
-        tasks = self.get_tasks()
-        tasks.sort(key=lambda t: (t.status == "done", t.priority))
+    def get_summary(self, done_note: Optional[str] = None) -> str:
+        """Получить текстовое резюме для промпта
+
+        done_note: if given, completed tasks are collapsed into this single line.
+        """
+        # Raw dicts from the cached data — no Task objects needed for a text render
+        data = self._load_data()
+        raw = sorted(data.get("tasks", []), key=_summary_order)
+        total = len(raw)
+        done = sum(1 for t in raw if t.get("status") == "done")
 
         lines = [f"## Tasks ({done}/{total} completed)"]
 
-        for t in tasks:
-            status_mark = {"pending": "[ ]", "in_progress": "[~]", "done": "[x]", "blocked": "[!]"}.get(
-                t.status, "[?]"
-            )
-            lines.append(f"{status_mark} [{t.id}] {t.title}")
-            if t.description:
-                lines.append(f"    {t.description[:100]}")
-            if t.success_criteria and t.status != "done":
-                lines.append(f"    SUCCESS CRITERIA: {t.success_criteria}")
+        for t in raw:
+            status = t.get("status", "pending")
+            if done_note and status == "done":
+                continue
+            status_mark = _STATUS_MARKS.get(status, "[?]")
+            lines.append(f"{status_mark} [{t.get('id')}] {t.get('title')}")
+            description = t.get("description")
+            if description:
+                lines.append(f"    {description[:100]}")
+            criteria = t.get("success_criteria")
+            if criteria and status != "done":
+                lines.append(f"    SUCCESS CRITERIA: {criteria}")
+        if done_note and done:
+            lines.append(done_note)
 
         # Добавляем raw thoughts если есть
-        thoughts = self.get_raw_thoughts()
+        thoughts = data.get("raw_thoughts", [])
         if thoughts:
             lines.append("\n## Raw Thoughts (need transform)")
             for th in thoughts:
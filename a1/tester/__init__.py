@@ -3,4 +3,4 @@ PocketCoder-A1 Vision Tester — autonomous QA agent
 Screenshot → AI analyzes → Action → Screenshot → ...
 """
 
-__all__ = ["VisionTester", "Browser", "Analyzer", "scenarios"]
+__all__ = ["VisionTester", "Browser", "AsyncBrowser", "Analyzer", "scenarios"]
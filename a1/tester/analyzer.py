@@ -5,36 +5,37 @@ Uses Claude Code CLI (Max subscription) to analyze screenshots.
 
 import base64
 import json
+import os
+import queue
+import re
+import select
 import subprocess
+import threading
+import time
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Iterable, List, Optional, Tuple
 
+from .._compat import new_hash as _new_hash
+from .._compat import orjson as _orjson
 
-class Analyzer:
-    """Analyze screenshots using Claude Vision via CLI"""
+# Resolved once — called for every stream-json line
+_JLOADS = _orjson.loads if _orjson else json.loads
 
-    def __init__(self, provider: str = "claude-cli"):
-        self.provider = provider
+# Outermost {...} in a reply — bare JSON or wrapped in a ```json block
+_JSON_OBJ_RE = re.compile(r"\{.*\}", re.S)
+# Outermost [...] in a batch reply
+_JSON_ARRAY_RE = re.compile(r"\[.*\]", re.S)
 
-    def analyze(
-        self, screenshot_path: Path, goal: str, context: str = ""
-    ) -> Dict[str, Any]:
-        """
-        Send screenshot to Claude, get structured analysis.
+# "#id", ".class", "[attr]", "tag.class > a" — a CSS selector rather than prose
+_SELECTOR_RE = re.compile(r"^[a-z]*[#.\[][\w\-\[\]=\"'#.:>() ]*$")
 
-        Returns dict with:
-          - observation: what the AI sees on screen
-          - status: "pass" | "fail" | "in_progress" | "error"
-          - action: next action to take (if any)
-          - details: explanation
-        """
-        image_b64 = base64.b64encode(screenshot_path.read_bytes()).decode()
+CACHE_PATH = Path.home() / ".cache" / "a1" / "analyzer.sqlite"
 
-        prompt = f"""You are a QA tester analyzing a web application screenshot.
+_PROMPT_TMPL = """You are a QA tester analyzing a web application screenshot.
 
 GOAL: {goal}
 
-{f"CONTEXT: {context}" if context else ""}
+{ctx}
 
 The screenshot is provided as a base64 PNG image below.
 Analyze the screenshot and respond with ONLY a JSON object (no markdown, no extra text):
@@ -46,12 +47,144 @@ Analyze the screenshot and respond with ONLY a JSON object (no markdown, no extr
   "details": "explanation of your analysis"
 }}
 
-IMAGE (base64): {image_b64[:100]}...
+IMAGE (base64): {image_b64}...
 
 Note: Since you cannot see the actual image in --print mode, analyze based on the goal and provide your best assessment. When integrated with Playwright MCP, full vision analysis will be available."""
 
+_BATCH_PROMPT_TMPL = """You are a QA tester analyzing {n} web application screenshots.
+
+{tasks}
+
+The screenshots are provided as base64 PNG images above.
+For each of the {n} tasks, in order, analyze the screenshot and respond with ONLY a JSON array of {n} objects (no markdown, no extra text):
+
+[
+  {{
+    "observation": "what you see on the screen",
+    "status": "pass|fail|in_progress|error",
+    "action": "what to do next (null if test complete)",
+    "details": "explanation of your analysis"
+  }}
+]
+
+Note: Since you cannot see the actual images in --print mode, analyze based on the goals and provide your best assessment. When integrated with Playwright MCP, full vision analysis will be available."""
+
+_BATCH_TASK_TMPL = """TASK {n}:
+GOAL: {goal}
+{ctx}
+IMAGE (base64): {image_b64}...
+"""
+
+
+class Analyzer:
+    """Analyze screenshots using Claude Vision via CLI
+
+    Each analysis gets a CLI process (stream-json in/out) of its own, so no
+    verdict sees earlier screenshots' prompts and answers. The next process
+    is started as soon as an answer arrives, so its startup + auth overlaps
+    whatever the caller does in between. Call close() when done.
+
+    Results are cached on disk by hash(screenshot bytes, goal, context),
+    so a repeated screenshot + goal skips the CLI entirely.
+    """
+
+    # Analyses per CLI conversation — more would put earlier screenshots'
+    # turns in context (and into cached verdicts)
+    MAX_CALLS_PER_SESSION = 1
+    IDLE_TIMEOUT = 300  # seconds
+    TIMEOUT = 60  # seconds per analysis
+
+    def __init__(self, provider: str = "claude-cli", cache_path: Optional[Path] = CACHE_PATH):
+        self.provider = provider
+        self._proc: Optional[subprocess.Popen] = None
+        self._buf = bytearray()
+        self._calls = 0
+        self._last_used = 0.0
+        self.cache_path = cache_path
+        self._db = None  # sqlite3.Connection, opened only when caching
+        self._db_lock = threading.Lock()
+        if cache_path is not None:
+            import sqlite3
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                self._db = sqlite3.connect(str(cache_path), timeout=5, check_same_thread=False)
+                self._db.execute("CREATE TABLE IF NOT EXISTS kv (hash BLOB PRIMARY KEY, json TEXT)")
+                self._db.commit()
+            except (OSError, sqlite3.Error):
+                self._db = None  # cache is an optimisation — run without it
+
+    def close(self) -> None:
+        """Stop the CLI session (if any)"""
+        proc, self._proc = self._proc, None
+        if proc is None:
+            return
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+        try:
+            proc.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+
+    def _cache_key(self, screenshot_path: Path, goal: str, context: str) -> bytes:
+        """Content hash over the screenshot bytes, goal and context"""
+        h = _new_hash()
+        with open(screenshot_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        h.update(b"\0" + goal.encode() + b"\0" + context.encode())
+        return h.digest()
+
+    def _cache_get(self, key: bytes) -> Optional[Dict[str, Any]]:
+        if self._db is None:
+            return None
+        import sqlite3
+        try:
+            with self._db_lock:
+                row = self._db.execute("SELECT json FROM kv WHERE hash=?", (key,)).fetchone()
+            return json.loads(row[0]) if row else None
+        except (sqlite3.Error, ValueError):
+            return None
+
+    def _cache_put(self, key: bytes, result: Dict[str, Any]) -> None:
+        if self._db is None:
+            return
+        import sqlite3
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO kv (hash, json) VALUES (?, ?)",
+                    (key, json.dumps(result)),
+                )
+                self._db.commit()
+        except sqlite3.Error:
+            pass
+
+    def analyze(
+        self, screenshot_path: Path, goal: str, context: str = ""
+    ) -> Dict[str, Any]:
+        """
+        Send screenshot to Claude, get structured analysis.
+
+        Returns dict with:
+          - observation: what the AI sees on screen
+          - status: "pass" | "fail" | "in_progress" | "error"
+          - action: next action to take (if any)
+          - details: explanation
+        """
+        key = self._cache_key(screenshot_path, goal, context)
+        cached = self._cache_get(key)
+        if cached is not None:
+            return cached
+
         if self.provider == "claude-cli":
-            return self._analyze_claude_cli(prompt)
+            result = self._analyze_claude_cli(self._prompt(screenshot_path, goal, context))
+            if result.get("status") != "error":  # errors are transient — retry next time
+                self._cache_put(key, result)
+            return result
         else:
             return {
                 "observation": "Unknown provider",
@@ -60,30 +193,209 @@ Note: Since you cannot see the actual image in --print mode, analyze based on th
                 "details": f"Provider '{self.provider}' not supported",
             }
 
-    def _analyze_claude_cli(self, prompt: str) -> Dict[str, Any]:
-        """Use Claude Code CLI for analysis"""
+    def analyze_batch(
+        self, items: Iterable[Tuple], max_batch: int = 8
+    ) -> List[Dict[str, Any]]:
+        """Analyze (screenshot_path, goal[, context]) items, up to max_batch per call.
+
+        Cache hits are answered directly; the rest go to Claude as one prompt
+        per group asking for a JSON array. A group whose reply doesn't line
+        up with its items is retried one analyze() at a time.
+        """
+        items = [(item[0], item[1], item[2] if len(item) > 2 else "") for item in items]
+        if self.provider != "claude-cli":
+            return [self.analyze(*item) for item in items]
+
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        pending = []
+        for i, (path, goal, context) in enumerate(items):
+            key = self._cache_key(path, goal, context)
+            cached = self._cache_get(key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append((i, key))
+
+        for start in range(0, len(pending), max_batch):
+            group = pending[start:start + max_batch]
+            for (i, key), result in zip(group, self._analyze_group([items[i] for i, _ in group])):
+                results[i] = result
+                if result.get("status") != "error":
+                    self._cache_put(key, result)
+        return results
+
+    def _analyze_group(self, group: List[Tuple[Path, str, str]]) -> List[Dict[str, Any]]:
+        """One CLI call for the whole group (falls back to one call per item)"""
+        if len(group) == 1:
+            return [self._analyze_claude_cli(self._prompt(*group[0]))]
+
+        tasks = "\n".join(
+            _BATCH_TASK_TMPL.format(
+                n=n,
+                goal=goal,
+                ctx=f"CONTEXT: {context}" if context else "",
+                image_b64=self._image_header(path),
+            )
+            for n, (path, goal, context) in enumerate(group, 1)
+        )
+        reply = self._analyze_claude_cli(
+            _BATCH_PROMPT_TMPL.format(n=len(group), tasks=tasks), parse=self._parse_batch
+        )
+        if isinstance(reply, dict):  # CLI error — same outcome for every item
+            return [dict(reply) for _ in group]
+        if (isinstance(reply, list) and len(reply) == len(group)
+                and all(isinstance(r, dict) for r in reply)):
+            return reply
+        return [self._analyze_claude_cli(self._prompt(*item)) for item in group]
+
+    def _prompt(self, screenshot_path: Path, goal: str, context: str) -> str:
+        return _PROMPT_TMPL.format(
+            goal=goal,
+            ctx=f"CONTEXT: {context}" if context else "",
+            image_b64=self._image_header(screenshot_path),
+        )
+
+    @staticmethod
+    def _image_header(screenshot_path: Path) -> str:
+        # Only the header makes it into the prompt — 75 bytes -> 100 base64 chars
+        with open(screenshot_path, "rb") as f:
+            return base64.b64encode(f.read(75)).decode()
+
+    def analyze_many(
+        self, items: Iterable[Tuple], max_workers: int = 4
+    ) -> List[Dict[str, Any]]:
+        """Analyze (screenshot_path, goal[, context]) items concurrently.
+
+        Each worker drives its own CLI session (this Analyzer plus up to
+        max_workers - 1 temporary ones); results come back in input order.
+        """
+        items = list(items)
+        workers = min(max_workers, len(items))
+        if workers <= 1:
+            return [self.analyze(*item) for item in items]
+
+        analyzers = [self] + [
+            Analyzer(self.provider, cache_path=self.cache_path) for _ in range(workers - 1)
+        ]
+        idle: "queue.Queue[Analyzer]" = queue.Queue()
+        for a in analyzers:
+            idle.put(a)
+
+        def run(item):
+            a = idle.get()
+            try:
+                return a.analyze(*item)
+            finally:
+                idle.put(a)
+
+        from concurrent.futures import ThreadPoolExecutor
         try:
-            result = subprocess.run(
-                ["claude", "--print", "-p", prompt],
-                capture_output=True, text=True, timeout=60
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                return list(pool.map(run, items))
+        finally:
+            for a in analyzers[1:]:
+                a.close()
+
+    def _session(self) -> subprocess.Popen:
+        """Running CLI session, (re)started when dead, exhausted or idle"""
+        proc = self._proc
+        if proc is not None and (
+            proc.poll() is not None
+            or self._calls >= self.MAX_CALLS_PER_SESSION
+            or time.monotonic() - self._last_used > self.IDLE_TIMEOUT
+        ):
+            self.close()
+        if self._proc is None:
+            # Clean env: remove CLAUDECODE to allow nested sessions; skip the
+            # version/update checks the CLI otherwise runs at every start
+            env = os.environ.copy()
+            env.pop("CLAUDECODE", None)
+            env.setdefault("CLAUDE_AGENT_SDK_SKIP_VERSION_CHECK", "1")
+            env.setdefault("DISABLE_AUTOUPDATER", "1")
+            self._proc = subprocess.Popen(
+                ["claude", "-p", "--input-format", "stream-json",
+                 "--output-format", "stream-json", "--verbose",
+                 "--no-session-persistence"],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                env=env,
             )
+            self._buf.clear()
+            self._calls = 0
+        return self._proc
+
+    def _recycle(self) -> None:
+        """Replace a used-up session now rather than on the next call"""
+        self.close()
+        try:
+            self._session()
+        except OSError:
+            pass  # reported by the next analysis
+
+    def _ask(self, proc: subprocess.Popen, prompt: str) -> Optional[Dict[str, Any]]:
+        """Send one user turn, return its "result" event (None if the CLI exited)"""
+        message = {"type": "user", "message": {"role": "user", "content": prompt}}
+        proc.stdin.write(json.dumps(message).encode() + b"\n")
+        proc.stdin.flush()
 
-            if result.returncode != 0:
+        fd = proc.stdout.fileno()
+        deadline = time.monotonic() + self.TIMEOUT
+        while True:
+            nl = self._buf.find(b"\n")
+            if nl >= 0:
+                line = bytes(self._buf[:nl])
+                del self._buf[:nl + 1]
+                try:
+                    event = _JLOADS(line)
+                except ValueError:
+                    continue
+                if event.get("type") == "result":
+                    return event
+                continue
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(proc.args, self.TIMEOUT)
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            chunk = os.read(fd, 65536)
+            if not chunk:
+                return None
+            self._buf += chunk
+
+    def _analyze_claude_cli(self, prompt: str, parse=None) -> Any:
+        """Use Claude Code CLI for analysis
+
+        The reply text goes through parse (default _parse_response); CLI
+        failures always come back as an error dict.
+        """
+        try:
+            proc = self._session()
+            event = self._ask(proc, prompt)
+            self._calls += 1
+            self._last_used = time.monotonic()
+
+            if event is None or event.get("is_error"):
+                details = "Claude CLI exited unexpectedly" if event is None else str(event.get("result", ""))
+                self.close()
                 return {
                     "observation": "Claude CLI error",
                     "status": "error",
                     "action": None,
-                    "details": result.stderr[:500],
+                    "details": details[:500],
                 }
 
-            return self._parse_response(result.stdout)
+            if self._calls >= self.MAX_CALLS_PER_SESSION:
+                self._recycle()
+            return (parse or self._parse_response)(str(event.get("result", "")))
 
         except subprocess.TimeoutExpired:
+            self.close()  # the session is mid-reply — don't reuse it
             return {
                 "observation": "Timeout",
                 "status": "error",
                 "action": None,
-                "details": "Claude CLI timed out after 60s",
+                "details": f"Claude CLI timed out after {self.TIMEOUT}s",
             }
         except FileNotFoundError:
             return {
@@ -92,30 +404,26 @@ Note: Since you cannot see the actual image in --print mode, analyze based on th
                 "action": None,
                 "details": "Install: npm install -g @anthropic-ai/claude-code",
             }
+        except OSError as e:  # e.g. broken pipe to a dead session
+            self.close()
+            return {
+                "observation": "Claude CLI error",
+                "status": "error",
+                "action": None,
+                "details": str(e)[:500],
+            }
 
     def _parse_response(self, text: str) -> Dict[str, Any]:
         """Parse Claude's JSON response"""
         text = text.strip()
 
-        # Try to find JSON in response
-        if text.startswith("{"):
+        m = _JSON_OBJ_RE.search(text)
+        if m:
             try:
-                return json.loads(text)
-            except json.JSONDecodeError:
+                return _JLOADS(m.group(0))
+            except ValueError:
                 pass
 
-        # Try to extract JSON from markdown code block
-        if "```" in text:
-            for block in text.split("```"):
-                block = block.strip()
-                if block.startswith("json"):
-                    block = block[4:].strip()
-                if block.startswith("{"):
-                    try:
-                        return json.loads(block)
-                    except json.JSONDecodeError:
-                        continue
-
         return {
             "observation": text[:200],
             "status": "error",
@@ -123,8 +431,38 @@ Note: Since you cannot see the actual image in --print mode, analyze based on th
             "details": "Could not parse structured response",
         }
 
-    def check_page_loads(self, screenshot_path: Path, page_name: str) -> Dict[str, Any]:
-        """Quick check: does the page render correctly?"""
+    def _parse_batch(self, text: str) -> Optional[List[Any]]:
+        """Parse a batch reply's JSON array (None if there isn't one)"""
+        m = _JSON_ARRAY_RE.search(text)
+        if m:
+            try:
+                reply = _JLOADS(m.group(0))
+            except ValueError:
+                return None
+            return reply if isinstance(reply, list) else None
+        return None
+
+    def check_page_loads(
+        self, screenshot_path: Path, page_name: str, browser=None
+    ) -> Dict[str, Any]:
+        """Quick check: does the page render correctly?
+
+        With a Browser, a page that has a title and visible text passes
+        without asking Claude; anything less is left to the vision check.
+        """
+        if browser is not None:
+            try:
+                title = browser.get_title()
+                text_len = browser.text_length()
+            except Exception:
+                title, text_len = "", 0
+            if title and text_len > 20:
+                return {
+                    "observation": f"'{title}' rendered {text_len} characters of text",
+                    "status": "pass",
+                    "action": None,
+                    "details": "Checked in the browser (title + visible text)",
+                }
         return self.analyze(
             screenshot_path,
             goal=f"Verify that the '{page_name}' page has loaded correctly. "
@@ -133,9 +471,21 @@ Note: Since you cannot see the actual image in --print mode, analyze based on th
         )
 
     def check_element_present(
-        self, screenshot_path: Path, element_desc: str
+        self, screenshot_path: Path, element_desc: str, browser=None
     ) -> Dict[str, Any]:
-        """Check if a specific element is visible"""
+        """Check if a specific element is visible
+
+        With a Browser and a CSS-selector-shaped element_desc, a visible
+        match passes without asking Claude; otherwise Claude decides.
+        """
+        if browser is not None and _SELECTOR_RE.match(element_desc):
+            if browser.is_visible(element_desc):
+                return {
+                    "observation": f"{element_desc} is visible",
+                    "status": "pass",
+                    "action": None,
+                    "details": "Checked in the browser (selector visible)",
+                }
         return self.analyze(
             screenshot_path,
             goal=f"Check if this element is visible on the page: {element_desc}",
@@ -3,31 +3,139 @@ Browser — Playwright Python wrapper for REAL browser interaction
 Actually clicks, types, navigates — not just HTTP requests.
 """
 
+import hashlib
+import json
+import os
+import signal
+import subprocess
 import tempfile
+import time
+import urllib.request
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Sequence
+
+# Visibility (Playwright's definition: has a box, not visibility:hidden) of
+# several selectors plus keyword presence in body text, in one round-trip
+_PROBE_JS = """({selectors, keywords}) => {
+    const visible = {};
+    for (const s of selectors) {
+        const el = document.querySelector(s);
+        visible[s] = !!el && el.getClientRects().length > 0
+            && getComputedStyle(el).visibility !== "hidden";
+    }
+    const body = document.body ? document.body.innerText : "";
+    const text = {};
+    for (const k of keywords) text[k] = body.includes(k);
+    return {visible, text};
+}"""
+
+# Same checks with the selector/keyword lists baked in (see compile_probe)
+_COMPILED_PROBE_TMPL = """() => {
+    const body = document.body ? document.body.innerText : "";
+    return [
+        %s.map(s => {
+            const el = document.querySelector(s);
+            return !!el && el.getClientRects().length > 0
+                && getComputedStyle(el).visibility !== "hidden";
+        }),
+        %s.map(k => body.includes(k)),
+    ];
+}"""
+
+
+def compile_probe(selectors: Sequence[str], keywords: Sequence[str] = ()) -> str:
+    """Build a probe script specialized to fixed selectors/keywords
+
+    Meant for module-level constants; run with Browser.run_probe(), which
+    returns ([visible per selector], [found per keyword]) in list order.
+    """
+    return _COMPILED_PROBE_TMPL % (json.dumps(list(selectors)), json.dumps(list(keywords)))
+
+# Trimmed-down Chromium for headless QA runs (A1_TESTER_FULL_RENDER=1 disables)
+FAST_LAUNCH_ARGS = (
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-background-timer-throttling",
+    "--disable-renderer-backgrounding",
+    "--disable-backgrounding-occluded-windows",
+)
+
+
+def _default_launch_args() -> List[str]:
+    return [] if os.environ.get("A1_TESTER_FULL_RENDER") == "1" else list(FAST_LAUNCH_ARGS)
+
+
+# Resource types block_resources aborts — stylesheets stay, visibility checks need them
+_BLOCKED_RESOURCES = frozenset({"image", "font", "media", "beacon", "imageset", "texttrack"})
+
+
+def _route_filter(route):
+    if route.request.resource_type in _BLOCKED_RESOURCES:
+        route.abort()
+    else:
+        route.continue_()
 
 
 class Browser:
-    """Real headless Chromium browser via Playwright Python API"""
+    """Real headless Chromium browser via Playwright Python API
+
+    cdp_port: also expose the launched Chromium on this DevTools port, so
+    other Browser instances (e.g. in worker threads) can share it.
+    cdp_endpoint: instead of launching, attach to such a Chromium and work
+    in a fresh BrowserContext of its own.
+    block_resources: abort image/font/media requests (faster page loads).
+    storage_state: start the context with these cookies/localStorage (a
+    file written by save_storage_state).
+    """
 
-    def __init__(self, viewport_width: int = 1280, viewport_height: int = 720):
+    def __init__(self, viewport_width: int = 1280, viewport_height: int = 720,
+                 cdp_port: Optional[int] = None, cdp_endpoint: Optional[str] = None,
+                 block_resources: bool = False, storage_state: Optional[str] = None):
         self.viewport_width = viewport_width
         self.viewport_height = viewport_height
+        self.cdp_port = cdp_port
+        self.cdp_endpoint = cdp_endpoint
+        self.block_resources = block_resources
+        self.storage_state = storage_state
+        self.launch_args = _default_launch_args()
         self._screenshots_dir = Path(tempfile.mkdtemp(prefix="a1_test_"))
         self._screenshot_count = 0
         self._pw = None
         self._browser = None
         self._page = None
+        # (url, dom digest, full_page, quality, image bytes) of the last screenshot;
+        # cleared by any interaction that could change what is rendered
+        self._last_shot: Optional[tuple] = None
+        # Bumped by every interaction; navigate() skips reloading the URL it
+        # last loaded at the current generation
+        self._state_gen = 0
+        self._last_nav: Optional[tuple] = None
+        # (url, generation, body text) from the last get_all_text()
+        self._last_text: Optional[tuple] = None
 
     def launch(self):
         """Launch headless browser"""
         from playwright.sync_api import sync_playwright
         self._pw = sync_playwright().start()
-        self._browser = self._pw.chromium.launch(headless=True)
-        self._page = self._browser.new_page(
-            viewport={"width": self.viewport_width, "height": self.viewport_height}
-        )
+        viewport = {"width": self.viewport_width, "height": self.viewport_height}
+        if self.cdp_endpoint:
+            # close() then only drops our context and disconnects
+            self._browser = self._pw.chromium.connect_over_cdp(self.cdp_endpoint)
+            self._page = self._browser.new_context(
+                viewport=viewport, storage_state=self.storage_state
+            ).new_page()
+        else:
+            args = list(self.launch_args)
+            if self.cdp_port:
+                args.append(f"--remote-debugging-port={self.cdp_port}")
+            self._browser = self._pw.chromium.launch(
+                headless=True, args=args, chromium_sandbox=False, timeout=15000
+            )
+            self._page = self._browser.new_page(
+                viewport=viewport, storage_state=self.storage_state
+            )
+        if self.block_resources:
+            self._page.context.route("**/*", _route_filter)
 
     def close(self):
         """Close browser"""
@@ -38,6 +146,9 @@ class Browser:
         self._page = None
         self._browser = None
         self._pw = None
+        self._last_shot = None
+        self._last_nav = None
+        self._last_text = None
 
     @property
     def page(self):
@@ -45,36 +156,99 @@ class Browser:
             self.launch()
         return self._page
 
-    def navigate(self, url: str, wait_until: str = "networkidle"):
-        """Navigate to URL and wait for page load"""
-        self.page.goto(url, wait_until=wait_until, timeout=15000)
+    def navigate(
+        self, url: str, wait_until: str = "domcontentloaded",
+        wait_for_selector: Optional[str] = None,
+    ):
+        """Navigate to URL and wait for page load
 
-    def screenshot(self, path: Optional[Path] = None, full_page: bool = False) -> Path:
-        """Take screenshot of current page"""
-        self._screenshot_count += 1
+        domcontentloaded rather than networkidle — polling pages never go
+        network-idle. Pass wait_until="load"/"networkidle" or a
+        wait_for_selector when a specific widget has to be ready.
+
+        A no-op when this URL is already loaded and nothing was clicked,
+        typed or evaluated since; call invalidate() to force a reload.
+        """
+        if self._last_nav != (url, self._state_gen) or self._page is None:
+            self.page.goto(url, wait_until=wait_until, timeout=15000)
+            self._last_nav = (url, self._state_gen)
+            self._last_text = None
+        if wait_for_selector:
+            self.page.wait_for_selector(wait_for_selector, timeout=15000)
+
+    def invalidate(self):
+        """Forget cached page state (next navigate() reloads, next screenshot renders)"""
+        self._state_gen += 1
+        self._last_shot = None
+        self._last_text = None
+
+    def screenshot(
+        self, path: Optional[Path] = None, full_page: bool = False,
+        quality: Optional[int] = None, page=None,
+    ) -> Path:
+        """Take screenshot of current page (or of page, e.g. from open_pages)
+
+        Lossless PNG by default; with quality (0-100) a JPEG is written
+        instead (suffix switched to .jpg) — several times smaller. Returns
+        the path actually written.
+
+        If neither the URL nor the DOM changed since the last screenshot
+        (and nothing was clicked/typed in between), the previous image is
+        reused instead of rendering a new one.
+        """
+        data = self.capture(full_page=full_page, quality=quality, page=page)
         if path is None:
             path = self._screenshots_dir / f"step_{self._screenshot_count:03d}.png"
-        self.page.screenshot(path=str(path), full_page=full_page)
+        path = Path(path)
+        if quality is not None:
+            path = path.with_suffix(".jpg")
+        write_new(path, data)
         return path
 
+    def capture(self, full_page: bool = False, quality: Optional[int] = None, page=None) -> bytes:
+        """Screenshot bytes (PNG, or JPEG with quality) without touching disk
+
+        Lets the caller hand the write off to another thread. Same reuse of
+        the previous image as screenshot().
+        """
+        self._screenshot_count += 1
+        page = page or self.page
+        dom = hashlib.blake2b(page.content().encode(), digest_size=16).digest()
+        key = (page.url, dom, full_page, quality)
+        last = self._last_shot
+        if last is not None and last[:4] == key:
+            return last[4]
+
+        if quality is None:
+            data = page.screenshot(full_page=full_page)
+        else:
+            data = page.screenshot(full_page=full_page, type="jpeg", quality=quality)
+        self._last_shot = key + (data,)
+        return data
+
     def click(self, selector: str, timeout: int = 5000):
         """Click an element by CSS selector"""
+        self.invalidate()
         self.page.click(selector, timeout=timeout)
 
     def fill(self, selector: str, text: str, timeout: int = 5000):
         """Fill text into an input field"""
+        self.invalidate()
         self.page.fill(selector, text, timeout=timeout)
 
     def type_text(self, selector: str, text: str, delay: int = 50):
         """Type text character by character (more realistic)"""
+        self.invalidate()
         self.page.type(selector, text, delay=delay)
 
     def press(self, selector: str, key: str):
         """Press a key (Enter, Tab, etc.)"""
+        self.invalidate()
         self.page.press(selector, key)
 
     def submit_form(self, selector: str, data: dict):
         """Fill and submit a form"""
+        self.invalidate()
         for field, value in data.items():
             self.page.fill(f'{selector} [name="{field}"]', value)
         self.page.click(f'{selector} button[type="submit"]')
@@ -95,6 +269,47 @@ class Browser:
         except Exception:
             return False
 
+    def probe(
+        self, selectors: Sequence[str] = (), keywords: Sequence[str] = (), page=None
+    ) -> Dict[str, Dict[str, bool]]:
+        """Check many selectors/keywords at once, without waiting
+
+        Returns {"visible": {selector: bool}, "text": {keyword: bool}}.
+        """
+        return (page or self.page).evaluate(
+            _PROBE_JS, {"selectors": list(selectors), "keywords": list(keywords)}
+        )
+
+    def save_storage_state(self, path: Path) -> Path:
+        """Write this context's cookies/localStorage to path (see storage_state)"""
+        self.page.context.storage_state(path=str(path))
+        return path
+
+    def run_probe(self, script: str, page=None) -> tuple:
+        """Run a compile_probe() script — (visible flags, keyword flags)"""
+        visible, text = (page or self.page).evaluate(script)
+        return visible, text
+
+    def open_pages(self, urls: Sequence[str], wait_until: str = "domcontentloaded") -> list:
+        """Open each URL in a new tab of this context, loading them concurrently
+
+        All navigations are started before any is waited on, so the total
+        wait is about the slowest page rather than the sum. The caller
+        closes the returned pages.
+        """
+        context = self.page.context
+        tabs = [context.new_page() for _ in urls]
+        try:
+            for tab, url in zip(tabs, urls):
+                tab.evaluate("url => { location.href = url; }", url)
+            for tab, url in zip(tabs, urls):
+                tab.wait_for_url(url, wait_until=wait_until, timeout=15000)
+        except Exception:
+            for tab in tabs:
+                tab.close()
+            raise
+        return tabs
+
     def wait_for(self, selector: str, timeout: int = 5000):
         """Wait for element to appear"""
         self.page.wait_for_selector(selector, timeout=timeout)
@@ -109,11 +324,27 @@ class Browser:
 
     def evaluate(self, js: str):
         """Execute JavaScript on page"""
+        self.invalidate()
         return self.page.evaluate(js)
 
     def get_all_text(self) -> str:
-        """Get all visible text on page"""
-        return self.page.inner_text("body")
+        """Get all visible text on page
+
+        Repeated calls on the same page state (no navigation or
+        interaction in between) return the text pulled the first time.
+        """
+        key = (self.page.url, self._state_gen)
+        if self._last_text is not None and self._last_text[:2] == key:
+            return self._last_text[2]
+        text = self.page.inner_text("body")
+        self._last_text = key + (text,)
+        return text
+
+    def text_length(self) -> int:
+        """Length of the visible page text — measured in the page, not transferred"""
+        return self.page.evaluate(
+            "document.body ? document.body.innerText.trim().length : 0"
+        )
 
     @property
     def screenshots_dir(self) -> Path:
@@ -122,3 +353,176 @@ class Browser:
     @property
     def screenshot_count(self) -> int:
         return self._screenshot_count
+
+
+def write_new(path: Path, data: bytes):
+    """Write data to path as a new file
+
+    Never writes through an existing file — it may be a hard link shared
+    with another screenshot (see VisionTester._snap).
+    """
+    path.unlink(missing_ok=True)
+    path.write_bytes(data)
+
+
+# ─── Persistent Chromium (survives between pca test runs) ───
+
+PERSISTENT_PORT = 9222
+
+
+def _cdp_ready(port: int) -> bool:
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/json/version", timeout=1):
+            return True
+    except OSError:
+        return False
+
+
+def ensure_persistent_chromium(state_dir: Path, port: int = PERSISTENT_PORT) -> str:
+    """CDP endpoint of the project's background Chromium, started if not running
+
+    The process (pid + port in state_dir/browser.pid, profile in
+    state_dir/browser-profile) outlives this Python process, so later runs
+    attach in milliseconds instead of cold-starting Chromium.
+    """
+    pid_file = state_dir / "browser.pid"
+    try:
+        state = json.loads(pid_file.read_text())
+        os.kill(state["pid"], 0)
+        if _cdp_ready(state["port"]):
+            return f"http://127.0.0.1:{state['port']}"
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    from playwright.sync_api import sync_playwright
+    with sync_playwright() as pw:
+        executable = pw.chromium.executable_path
+
+    proc = subprocess.Popen(
+        [executable, "--headless=new", f"--remote-debugging-port={port}",
+         f"--user-data-dir={state_dir / 'browser-profile'}",
+         "--no-first-run", "--no-default-browser-check", *_default_launch_args()],
+        stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL, start_new_session=True,
+    )
+    deadline = time.monotonic() + 15
+    while not _cdp_ready(port):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            proc.kill()
+            raise RuntimeError(f"Chromium did not open DevTools port {port}")
+        time.sleep(0.1)
+
+    state_dir.mkdir(parents=True, exist_ok=True)
+    pid_file.write_text(json.dumps({"pid": proc.pid, "port": port}))
+    return f"http://127.0.0.1:{port}"
+
+
+def shutdown_persistent_chromium(state_dir: Path) -> bool:
+    """Stop the background Chromium, if any. Returns True if one was running"""
+    pid_file = state_dir / "browser.pid"
+    try:
+        state = json.loads(pid_file.read_text())
+    except (OSError, ValueError):
+        return False
+    pid_file.unlink(missing_ok=True)
+    try:
+        os.kill(state["pid"], signal.SIGTERM)
+        return True
+    except (OSError, KeyError, TypeError):
+        return False
+
+
+class AsyncBrowser:
+    """Headless Chromium with a pool of pages for parallel screenshots
+
+    One browser process and one BrowserContext; pool_size tabs navigate and
+    screenshot concurrently, each URL on whichever tab is free.
+
+        async with AsyncBrowser(pool_size=4) as b:
+            paths = await b.navigate_and_screenshot_many(urls)
+    """
+
+    def __init__(self, pool_size: int = 4,
+                 viewport_width: int = 1280, viewport_height: int = 720):
+        self.pool_size = pool_size
+        self.viewport_width = viewport_width
+        self.viewport_height = viewport_height
+        self._screenshots_dir = Path(tempfile.mkdtemp(prefix="a1_test_"))
+        self._pw = None
+        self._browser = None
+        self._context = None
+        self._pages = None  # asyncio.Queue of idle pages
+
+    async def launch(self):
+        """Launch headless browser and open the page pool"""
+        import asyncio
+
+        from playwright.async_api import async_playwright
+        self._pw = await async_playwright().start()
+        self._browser = await self._pw.chromium.launch(headless=True)
+        self._context = await self._browser.new_context(
+            viewport={"width": self.viewport_width, "height": self.viewport_height}
+        )
+        self._pages = asyncio.Queue()
+        for _ in range(self.pool_size):
+            self._pages.put_nowait(await self._context.new_page())
+
+    async def close(self):
+        """Close browser"""
+        if self._browser:
+            await self._browser.close()
+        if self._pw:
+            await self._pw.stop()
+        self._pages = None
+        self._context = None
+        self._browser = None
+        self._pw = None
+
+    async def __aenter__(self):
+        await self.launch()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def navigate_and_screenshot(
+        self, url: str, path: Path, wait_until: str = "domcontentloaded",
+        full_page: bool = False, quality: Optional[int] = None,
+    ) -> Path:
+        """Load url on a free pooled page and screenshot it (see Browser.screenshot)"""
+        page = await self._pages.get()
+        try:
+            await page.goto(url, wait_until=wait_until, timeout=15000)
+            if quality is None:
+                await page.screenshot(path=str(path), full_page=full_page)
+            else:
+                path = Path(path).with_suffix(".jpg")
+                await page.screenshot(path=str(path), full_page=full_page,
+                                      type="jpeg", quality=quality)
+        finally:
+            self._pages.put_nowait(page)
+        return path
+
+    async def navigate_and_screenshot_many(self, urls: List[str], **kwargs) -> List[Path]:
+        """Screenshot every URL concurrently across the pool, in input order"""
+        import asyncio
+        return list(await asyncio.gather(*(
+            self.navigate_and_screenshot(
+                url, self._screenshots_dir / f"page_{i:03d}.png", **kwargs
+            )
+            for i, url in enumerate(urls)
+        )))
+
+    @property
+    def screenshots_dir(self) -> Path:
+        return self._screenshots_dir
+
+
+def capture_many(urls: List[str], pool_size: int = 4, **kwargs) -> List[Path]:
+    """Blocking helper: screenshot every URL with an AsyncBrowser page pool"""
+    import asyncio
+
+    async def run():
+        async with AsyncBrowser(pool_size=pool_size) as b:
+            return await b.navigate_and_screenshot_many(urls, **kwargs)
+    return asyncio.run(run())
@@ -2,42 +2,151 @@
 Report — generate HTML/JSON test reports with screenshots
 """
 
-import base64
+import html as _html
 import json
+import os
+import shutil
+from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
+
+from .._compat import DATACLASS_SLOTS
+from .._compat import new_hash as _new_hash
+from .._compat import orjson as _orjson
+
+_STATUS_COLOR = {"pass": "#10b981", "fail": "#ef4444", "error": "#f59e0b"}
+_STEP_COLOR = {"pass": "#10b981", "fail": "#ef4444"}
+
+# Read size for streaming screenshots into the report — a multiple of 3,
+# so each chunk encodes to base64 without padding
+_B64_CHUNK = 48 * 1024
+
+# Screenshots are copied here (next to the report) under their content hash
+ASSETS_DIR = "assets"
+
+_ASSET_TMPL = '<img src="{src}" loading="lazy" style="max-width:100%;border:1px solid #ddd;border-radius:8px;margin-top:8px">'
+_SCREENSHOT_HEAD_TMPL = '<img src="data:{mime};base64,'
+_MIME = {".jpg": "image/jpeg", ".jpeg": "image/jpeg"}
+_SCREENSHOT_TAIL = '" style="max-width:100%;border:1px solid #ddd;border-radius:8px;margin-top:8px">'
+_STEP_DETAILS_TMPL = '<div style="color:#666;font-size:13px;margin-top:4px">{details}</div>'
+_STEP_HEAD_TMPL = '''
+                <div style="padding:8px 16px;border-left:3px solid {color};margin:8px 0;background:#f8f9fa;border-radius:0 8px 8px 0">
+                    <strong>{description}</strong>
+                    <span style="color:{color};font-weight:bold;float:right">{status}</span>
+                    {details}
+                    '''
+_STEP_TAIL = '''
+                </div>
+                '''
+_SCENARIO_ERROR_TMPL = '<div style="color:#ef4444;margin-bottom:12px">{error}</div>'
+_SCENARIO_HEAD_TMPL = '''
+            <div style="background:white;border:1px solid #dee2e6;border-radius:12px;padding:20px;margin-bottom:16px">
+                <div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:16px">
+                    <h3 style="margin:0">#{scenario_id} {name}</h3>
+                    <span style="background:{color};color:white;padding:4px 12px;border-radius:12px;font-size:13px">{status}</span>
+                </div>
+                {error}
+                '''
+_SCENARIO_TAIL = '''
+            </div>
+            '''
+_PAGE_HEAD_TMPL = '''<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="UTF-8">
+    <title>A1 Vision Test Report</title>
+    <style>
+        body {{ font-family: -apple-system, sans-serif; max-width: 900px; margin: 0 auto; padding: 24px; background: #f8f9fa; }}
+        .summary {{ display: grid; grid-template-columns: repeat(4, 1fr); gap: 16px; margin-bottom: 24px; }}
+        .stat {{ background: white; border-radius: 12px; padding: 20px; text-align: center; border: 1px solid #dee2e6; }}
+        .stat-value {{ font-size: 32px; font-weight: 600; }}
+        .stat-label {{ font-size: 13px; color: #6c757d; margin-top: 4px; }}
+    </style>
+</head>
+<body>
+    <h1>A1 Vision Test Report</h1>
+    <p style="color:#6c757d">{started}{duration}</p>
+
+    <div class="summary">
+        <div class="stat">
+            <div class="stat-value">{total}</div>
+            <div class="stat-label">Total</div>
+        </div>
+        <div class="stat">
+            <div class="stat-value" style="color:#10b981">{passed}</div>
+            <div class="stat-label">Passed</div>
+        </div>
+        <div class="stat">
+            <div class="stat-value" style="color:#ef4444">{failed}</div>
+            <div class="stat-label">Failed</div>
+        </div>
+        <div class="stat">
+            <div class="stat-value" style="color:#f59e0b">{errors}</div>
+            <div class="stat-label">Errors</div>
+        </div>
+    </div>
+
+    '''
+_PAGE_TAIL = '''
+</body>
+</html>'''
 
 
+@dataclass(**DATACLASS_SLOTS)
 class StepResult:
-    def __init__(self, step_num=0, action="", description="", status="",
-                 screenshot="", details="", duration_ms=0):
-        self.step_num = step_num
-        self.action = action
-        self.description = description
-        self.status = status
-        self.screenshot = screenshot
-        self.details = details
-        self.duration_ms = duration_ms
+    step_num: int = 0
+    action: str = ""
+    description: str = ""
+    status: str = ""
+    screenshot: str = ""
+    details: str = ""
+    duration_ms: int = 0
 
     def to_dict(self):
-        return vars(self)
+        return {
+            "step_num": self.step_num,
+            "action": self.action,
+            "description": self.description,
+            "status": self.status,
+            "screenshot": self.screenshot,
+            "details": self.details,
+            "duration_ms": self.duration_ms,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "StepResult":
+        return cls(**data)
 
 
+@dataclass(**DATACLASS_SLOTS)
 class ScenarioResult:
-    def __init__(self, scenario_id=0, scenario_name="", status="",
-                 steps=None, duration_ms=0, error=""):
-        self.scenario_id = scenario_id
-        self.scenario_name = scenario_name
-        self.status = status
-        self.steps = steps or []
-        self.duration_ms = duration_ms
-        self.error = error
+    scenario_id: int = 0
+    scenario_name: str = ""
+    status: str = ""
+    steps: List[Any] = field(default_factory=list)
+    duration_ms: int = 0
+    error: str = ""
+
+    def __post_init__(self):
+        if self.steps is None:
+            self.steps = []
 
     def to_dict(self):
-        d = vars(self).copy()
-        d["steps"] = [s.to_dict() if hasattr(s, "to_dict") else s for s in self.steps]
-        return d
+        return {
+            "scenario_id": self.scenario_id,
+            "scenario_name": self.scenario_name,
+            "status": self.status,
+            "steps": [s.to_dict() if isinstance(s, StepResult) else s for s in self.steps],
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ScenarioResult":
+        data = dict(data)
+        data["steps"] = [StepResult.from_dict(s) for s in data.get("steps", [])]
+        return cls(**data)
 
 
 class TestReport:
@@ -70,9 +179,9 @@ class TestReport:
     def errors(self) -> int:
         return len([r for r in self.results if r.status == "error"])
 
-    def save_json(self, path: Path) -> Path:
-        """Save JSON report"""
-        data = {
+    def to_json_bytes(self) -> bytes:
+        """JSON report as indented UTF-8 bytes"""
+        return _dumps({
             "started_at": self.started_at.isoformat(),
             "finished_at": self.finished_at.isoformat() if self.finished_at else None,
             "summary": {
@@ -81,113 +190,154 @@ class TestReport:
                 "failed": self.failed,
                 "errors": self.errors,
             },
-            "scenarios": [r.to_dict() for r in self.results],
-        }
+            # orjson serializes the (slots) dataclasses itself, in field order
+            "scenarios": self.results if _orjson else [r.to_dict() for r in self.results],
+        })
 
+    def save_json(self, path: Path) -> Path:
+        """Save JSON report"""
         path.parent.mkdir(parents=True, exist_ok=True)
-        with open(path, "w") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-
+        path.write_bytes(self.to_json_bytes())
         return path
 
-    def save_html(self, path: Path) -> Path:
-        """Save HTML report with embedded screenshots"""
-        path.parent.mkdir(parents=True, exist_ok=True)
+    def save_html(self, path: Path, embed: bool = False) -> Path:
+        """Save HTML report with screenshots
 
-        scenarios_html = ""
-        for r in self.results:
-            status_color = {"pass": "#10b981", "fail": "#ef4444", "error": "#f59e0b"}.get(
-                r.status, "#6c757d"
-            )
-            status_icon = {"pass": "check-circle", "fail": "x-circle", "error": "exclamation-triangle"}.get(
-                r.status, "question-circle"
-            )
-
-            steps_html = ""
-            for s in r.steps:
-                s_dict = s.to_dict() if hasattr(s, "to_dict") else s
-                s_color = {"pass": "#10b981", "fail": "#ef4444"}.get(
-                    s_dict.get("status", ""), "#6c757d"
-                )
-
-                screenshot_html = ""
-                ss_path = s_dict.get("screenshot", "")
-                if ss_path and Path(ss_path).exists():
-                    img_b64 = base64.b64encode(Path(ss_path).read_bytes()).decode()
-                    screenshot_html = f'<img src="data:image/png;base64,{img_b64}" style="max-width:100%;border:1px solid #ddd;border-radius:8px;margin-top:8px">'
-
-                steps_html += f'''
-                <div style="padding:8px 16px;border-left:3px solid {s_color};margin:8px 0;background:#f8f9fa;border-radius:0 8px 8px 0">
-                    <strong>{_esc(s_dict.get("description", ""))}</strong>
-                    <span style="color:{s_color};font-weight:bold;float:right">{s_dict.get("status", "").upper()}</span>
-                    {f'<div style="color:#666;font-size:13px;margin-top:4px">{_esc(s_dict.get("details", ""))}</div>' if s_dict.get("details") else ""}
-                    {screenshot_html}
-                </div>
-                '''
+        Screenshots go to ASSETS_DIR next to the report, named by content
+        hash (one copy per unique image, shared by all reports in the
+        directory), and are referenced with lazy-loaded <img> tags.
+        embed=True inlines them as base64 for a single self-contained file.
 
-            scenarios_html += f'''
-            <div style="background:white;border:1px solid #dee2e6;border-radius:12px;padding:20px;margin-bottom:16px">
-                <div style="display:flex;justify-content:space-between;align-items:center;margin-bottom:16px">
-                    <h3 style="margin:0">#{r.scenario_id} {_esc(r.scenario_name)}</h3>
-                    <span style="background:{status_color};color:white;padding:4px 12px;border-radius:12px;font-size:13px">{r.status.upper()}</span>
-                </div>
-                {f'<div style="color:#ef4444;margin-bottom:12px">{_esc(r.error)}</div>' if r.error else ""}
-                {steps_html}
-            </div>
-            '''
+        Written to disk piece by piece — embedded screenshots are
+        base64-encoded in chunks straight into the file, so no full report
+        string (or full image) is held in memory.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        assets = None if embed else path.parent / ASSETS_DIR
 
         duration = ""
         if self.finished_at:
             dur = (self.finished_at - self.started_at).total_seconds()
             duration = f" in {dur:.1f}s"
 
-        html = f'''<!DOCTYPE html>
-<html>
-<head>
-    <meta charset="UTF-8">
-    <title>A1 Vision Test Report</title>
-    <style>
-        body {{ font-family: -apple-system, sans-serif; max-width: 900px; margin: 0 auto; padding: 24px; background: #f8f9fa; }}
-        .summary {{ display: grid; grid-template-columns: repeat(4, 1fr); gap: 16px; margin-bottom: 24px; }}
-        .stat {{ background: white; border-radius: 12px; padding: 20px; text-align: center; border: 1px solid #dee2e6; }}
-        .stat-value {{ font-size: 32px; font-weight: 600; }}
-        .stat-label {{ font-size: 13px; color: #6c757d; margin-top: 4px; }}
-    </style>
-</head>
-<body>
-    <h1>A1 Vision Test Report</h1>
-    <p style="color:#6c757d">{self.started_at.strftime("%Y-%m-%d %H:%M:%S")}{duration}</p>
-
-    <div class="summary">
-        <div class="stat">
-            <div class="stat-value">{self.total}</div>
-            <div class="stat-label">Total</div>
-        </div>
-        <div class="stat">
-            <div class="stat-value" style="color:#10b981">{self.passed}</div>
-            <div class="stat-label">Passed</div>
-        </div>
-        <div class="stat">
-            <div class="stat-value" style="color:#ef4444">{self.failed}</div>
-            <div class="stat-label">Failed</div>
-        </div>
-        <div class="stat">
-            <div class="stat-value" style="color:#f59e0b">{self.errors}</div>
-            <div class="stat-label">Errors</div>
-        </div>
-    </div>
-
-    {scenarios_html}
-</body>
-</html>'''
-
-        with open(path, "w") as f:
-            f.write(html)
+        with open(path, "w", buffering=1 << 20) as f:
+            f.write(_PAGE_HEAD_TMPL.format(
+                started=self.started_at.strftime("%Y-%m-%d %H:%M:%S"),
+                duration=duration,
+                total=self.total,
+                passed=self.passed,
+                failed=self.failed,
+                errors=self.errors,
+            ))
+            for r in self.results:
+                self._write_scenario(f, r, assets)
+            f.write(_PAGE_TAIL)
 
         return path
 
+    def _write_scenario(self, f, r: ScenarioResult, assets: Optional[Path]) -> None:
+        f.write(_SCENARIO_HEAD_TMPL.format(
+            scenario_id=r.scenario_id,
+            name=_esc(r.scenario_name),
+            color=_STATUS_COLOR.get(r.status, "#6c757d"),
+            status=r.status.upper(),
+            error=_SCENARIO_ERROR_TMPL.format(error=_esc(r.error)) if r.error else "",
+        ))
+        for st in r.steps:
+            if isinstance(st, StepResult):
+                description, status, details, ss_path = (
+                    st.description, st.status, st.details, st.screenshot
+                )
+            else:  # plain dict step
+                description, status, details, ss_path = (
+                    st.get("description", ""), st.get("status", ""),
+                    st.get("details"), st.get("screenshot", ""),
+                )
+            f.write(_STEP_HEAD_TMPL.format(
+                color=_STEP_COLOR.get(status, "#6c757d"),
+                description=_esc(description),
+                status=status.upper(),
+                details=_STEP_DETAILS_TMPL.format(details=_esc(details)) if details else "",
+            ))
+            if ss_path and Path(ss_path).exists() and assets is not None:
+                name = _copy_asset(Path(ss_path), assets)
+                f.write(_ASSET_TMPL.format(src=f"{ASSETS_DIR}/{name}"))
+            elif ss_path and Path(ss_path).exists():
+                f.write(_SCREENSHOT_HEAD_TMPL.format(
+                    mime=_MIME.get(Path(ss_path).suffix.lower(), "image/png")
+                ))
+                _write_b64(f, Path(ss_path))
+                f.write(_SCREENSHOT_TAIL)
+            f.write(_STEP_TAIL)
+        f.write(_SCENARIO_TAIL)
+
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    """Serialize a report as indented UTF-8 JSON"""
+    if _orjson:
+        return _orjson.dumps(data, option=_orjson.OPT_INDENT_2 | _orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _copy_asset(src: Path, assets: Path) -> str:
+    """Copy src into assets/ under its content hash, return the file name"""
+    digest = _new_hash()
+    with open(src, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    name = digest.hexdigest()[:16] + (src.suffix or ".png")
+    dst = assets / name
+    if not dst.exists():
+        assets.mkdir(parents=True, exist_ok=True)
+        tmp = dst.with_name(f"{name}.{os.getpid()}.tmp")
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    return name
+
+
+def _write_b64(f, src: Path) -> None:
+    """Stream src into text file f as base64
+
+    The encoding is kept in a <src>.b64 sidecar stamped with src's mtime;
+    while mtime and size still match, re-renders copy the sidecar instead
+    of re-encoding the image.
+    """
+    st = src.stat()
+    sidecar = src.with_name(src.name + ".b64")
+    try:
+        cached = sidecar.stat()
+        if cached.st_mtime_ns == st.st_mtime_ns and cached.st_size == (st.st_size + 2) // 3 * 4:
+            with open(sidecar, "r") as c:
+                shutil.copyfileobj(c, f, _B64_CHUNK)
+            return
+    except OSError:
+        pass
+
+    import base64
+
+    tmp = sidecar.with_name(sidecar.name + ".tmp")
+    try:
+        out = open(tmp, "w")
+    except OSError:
+        out = None  # read-only screenshot dir — just encode
+    try:
+        with open(src, "rb") as img:
+            for chunk in iter(lambda: img.read(_B64_CHUNK), b""):
+                encoded = base64.b64encode(chunk).decode("ascii")
+                f.write(encoded)
+                if out is not None:
+                    out.write(encoded)
+        if out is not None:
+            out.close()
+            os.utime(tmp, ns=(st.st_atime_ns, st.st_mtime_ns))
+            os.replace(tmp, sidecar)
+            out = None
+    finally:
+        if out is not None:
+            out.close()
+            tmp.unlink(missing_ok=True)
+
 
 def _esc(text: str) -> str:
-    """Escape HTML"""
-    import html
-    return html.escape(str(text)) if text else ""
+    """Escape HTML text content (never used inside attributes, so quotes stay)"""
+    return _html.escape(str(text), quote=False) if text else ""
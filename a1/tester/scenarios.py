@@ -2,9 +2,10 @@
 Test Scenarios — predefined QA scenarios for A1 dashboard
 """
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass
 from enum import Enum
-from typing import List, Optional
+from functools import lru_cache
+from typing import Optional, Tuple
 
 
 class ScenarioType(Enum):
@@ -13,7 +14,7 @@ class ScenarioType(Enum):
     INTEGRATION = "integration"
 
 
-@dataclass
+@dataclass(frozen=True)
 class TestStep:
     action: str  # navigate, screenshot, check, click, type, wait, api_call, cli
     target: str  # URL, selector, CLI command
@@ -21,20 +22,31 @@ class TestStep:
     description: str = ""
 
 
-@dataclass
+@dataclass(frozen=True)
 class Scenario:
     id: int
     name: str
     description: str
     type: ScenarioType
-    steps: List[TestStep] = field(default_factory=list)
+    steps: Tuple[TestStep, ...] = ()
     expected: str = ""
-    tags: List[str] = field(default_factory=list)
-
-
-def get_all_scenarios(base_url: str = "http://localhost:7331") -> List[Scenario]:
-    """Return all 7 test scenarios"""
-    return [
+    tags: Tuple[str, ...] = ()
+    # Source files (relative to the a1 package) that fully determine the
+    # outcome; if unchanged since a pass, VisionTester.run_all reuses it.
+    # Empty for scenarios that depend on runtime state (tasks, agent)
+    deps: Tuple[str, ...] = ()
+
+    def __post_init__(self):
+        # Scenarios are cached and shared between callers — keep them immutable
+        object.__setattr__(self, "steps", tuple(self.steps))
+        object.__setattr__(self, "tags", tuple(self.tags))
+        object.__setattr__(self, "deps", tuple(self.deps))
+
+
+@lru_cache(maxsize=4)
+def get_all_scenarios(base_url: str = "http://localhost:7331") -> Tuple[Scenario, ...]:
+    """Return all 7 test scenarios (built once per base_url)"""
+    return (
         # 1. Dashboard loads
         Scenario(
             id=1,
@@ -51,6 +63,7 @@ def get_all_scenarios(base_url: str = "http://localhost:7331") -> List[Scenario]
             ],
             expected="Dashboard renders with all 4 stat cards, task list, and add form",
             tags=["web", "smoke"],
+            deps=["dashboard.py"],
         ),
 
         # 2. Add task via web
@@ -130,6 +143,7 @@ def get_all_scenarios(base_url: str = "http://localhost:7331") -> List[Scenario]
             ],
             expected="All 6 pages render without errors",
             tags=["web", "navigation", "smoke"],
+            deps=["dashboard.py"],
         ),
 
         # 5. Theme toggle
@@ -150,6 +164,7 @@ def get_all_scenarios(base_url: str = "http://localhost:7331") -> List[Scenario]
             ],
             expected="Theme toggle button is present and functional",
             tags=["web", "ui"],
+            deps=["dashboard.py"],
         ),
 
         # 6. Start/Stop agent
@@ -192,7 +207,7 @@ def get_all_scenarios(base_url: str = "http://localhost:7331") -> List[Scenario]
             expected="/api/status returns JSON with checkpoint, tasks, progress, running fields",
             tags=["api", "integration"],
         ),
-    ]
+    )
 
 
 def get_scenario_by_id(scenario_id: int, base_url: str = "http://localhost:7331") -> Optional[Scenario]:
@@ -2,12 +2,29 @@
 Validator — "зрение" агента, проверка результатов
 """
 
+import atexit
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import selectors
+import shutil
 import subprocess
-from dataclasses import dataclass
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
 from enum import Enum
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
+from ._compat import DATACLASS_SLOTS, shutdown_cancelling
+
 
 class ValidationResult(Enum):
     OK = "ok"
@@ -16,7 +33,19 @@ class ValidationResult(Enum):
     ERROR = "error"
 
 
-@dataclass
+# Enum members are singletons: compare with `is` and look them up by value
+# through a plain dict instead of the EnumType.__call__ machinery
+_RESULT_BY_VALUE = {member.value: member for member in ValidationResult}
+
+_RESULT_ICONS = {
+    ValidationResult.OK: "[OK]",
+    ValidationResult.FAIL: "[FAIL]",
+    ValidationResult.SKIP: "[SKIP]",
+    ValidationResult.ERROR: "[ERR]",
+}
+
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class ValidationReport:
     result: ValidationResult
     message: str
@@ -24,43 +53,441 @@ class ValidationReport:
     command: Optional[str] = None
 
 
+# Seconds a cached run_all() result stays valid on an unchanged tree
+CACHE_TTL = 300
+
+# Not part of the fingerprint: VCS/agent state, what the checks themselves
+# write (bytecode, tool caches, build output), and installed dependencies
+# (too large to walk on every call)
+_FINGERPRINT_SKIP = frozenset({
+    ".git", ".a1", "__pycache__", ".pytest_cache", ".ruff_cache", ".mypy_cache",
+    "dist", "build", "node_modules", ".venv", "venv",
+})
+
+# Directories never searched for Python files to compile
+_PY_SKIP_DIRS = frozenset({
+    ".git", "node_modules", "__pycache__", ".venv", "venv", "dist", "build",
+})
+
+# Files per `python -m py_compile` call when the process pool is unavailable
+# (keeps the command line well under ARG_MAX)
+_PY_COMPILE_BATCH = 500
+
+# Start of one file's error in py_compile's stderr
+_PY_COMPILE_ERR_RE = re.compile(r'^\s*File "(.+?)", line \d+', re.M)
+
+# check_criteria: "X.ext exists" / "exists X.ext" (case-insensitive, so the
+# file name keeps its original case)
+_CRIT_FILE_EXIST_A = re.compile(r"['\"]?(\S+\.\w{1,5})['\"]?\s+exist", re.IGNORECASE)
+_CRIT_FILE_EXIST_B = re.compile(r"exist\w*\s+['\"]?(\S+\.\w{1,5})['\"]?", re.IGNORECASE)
+
+# Config files (besides the project's .py files and the linter binary) each
+# memoized check depends on; a check whose inputs are unchanged since it last
+# passed is not re-run. Only lint qualifies — tests and builds read data
+# files, templates and installed packages too, so they always run
+_CHECK_INPUTS = {
+    "lint": ("pyproject.toml", "setup.cfg", "tox.ini", "ruff.toml", ".ruff.toml", ".flake8"),
+}
+
+# Bytes kept from the end of each stream of test/build commands — reports
+# show at most the last 500 characters
+_OUTPUT_TAIL = 8192
+
+# pytest-xdist: one worker per CPU, a test file's tests kept on one worker
+_XDIST_ARGS = ["-n", "auto", "--dist=loadfile", "-p", "no:cacheprovider"]
+
+# Child processes inherit no fds anyway on Linux: everything Python opens is
+# non-inheritable (PEP 446), so skip the close-all-fds walk there.
+# subprocess already uses vfork for our Popen arguments (no preexec_fn,
+# uid/gid or process group changes) — keep it that way
+_CLOSE_FDS = sys.platform != "linux"
+
+# check_files_exist stats longer lists from a few threads — stat() releases
+# the GIL, which matters on network filesystems / WSL
+_PARALLEL_STAT_MIN = 64
+
+# check_files_exist stops counting after this many missing files on lists
+# longer than _MISSING_EARLY_EXIT_MIN (reported as "N+ files missing")
+_MISSING_EARLY_EXIT = 100
+_MISSING_EARLY_EXIT_MIN = 1000
+
+# (project dir, fingerprint) -> run in progress; concurrent callers share it
+_INFLIGHT: Dict[Tuple[str, str], Future] = {}
+_INFLIGHT_LOCK = threading.Lock()
+
+# Interpreters (path + mtime) known to have a module — saves a python
+# start-up per run_all() just to find out pytest is there
+TOOLS_CACHE = Path.home() / ".cache" / "a1" / "tools.json"
+
+# Compile workers shared by every Validator and run_all() call — started on
+# first use, shut down at interpreter exit
+_EXECUTOR: Optional[ProcessPoolExecutor] = None
+_EXECUTOR_LOCK = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is None:
+            # spawn, not fork: run_all() calls this from a worker thread, and
+            # forking a multi-threaded process can deadlock the child
+            _EXECUTOR = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            atexit.register(_EXECUTOR.shutdown)
+        return _EXECUTOR
+
+
+@functools.lru_cache(maxsize=None)
+def _which(name: str) -> Optional[str]:
+    """shutil.which, looked up once per process"""
+    return shutil.which(name)
+
+
+@functools.lru_cache(maxsize=None)
+def _python_has_module(module: str) -> bool:
+    """Whether the `python` on PATH can import module
+
+    Probed once per process; positive answers are also kept in TOOLS_CACHE
+    (keyed by interpreter path and mtime — a venv's own python counts as
+    its own interpreter). Negative ones aren't, so a later
+    `pip install` is noticed.
+    """
+    python = _which("python")
+    if python is None:
+        return False
+    try:
+        key = f"{os.path.abspath(python)}:{os.stat(python).st_mtime_ns}:{module}"
+    except OSError:
+        return False
+    try:
+        known = json.loads(TOOLS_CACHE.read_text())
+    except (OSError, ValueError):
+        known = {}
+    if known.get(key):
+        return True
+
+    probe = f"import importlib.util, sys; sys.exit(importlib.util.find_spec({module!r}) is None)"
+    try:
+        found = subprocess.run([python, "-c", probe], capture_output=True, timeout=10).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    if found:
+        known[key] = True
+        try:
+            TOOLS_CACHE.parent.mkdir(parents=True, exist_ok=True)
+            TOOLS_CACHE.write_text(json.dumps(known, indent=2))
+        except OSError:
+            pass
+    return found
+
+
+def _report_to_dict(report: ValidationReport) -> dict:
+    return {**asdict(report), "result": report.result.value}
+
+
+def _report_from_dict(data: dict) -> ValidationReport:
+    return ValidationReport(**{**data, "result": _RESULT_BY_VALUE[data["result"]]})
+
+
+def _memoize_per_instance(fn):
+    """Share a check's report between run_all() and check_criteria()
+
+    One report per method and tree state (Validator.tree_key(); callers
+    that already have it pass it in to save the walk): a later call on the
+    unchanged tree gets the same report, a concurrent one waits for the
+    running call instead of starting the command again. Dropped by
+    Validator.invalidate_cache().
+    """
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(self, key: Optional[str] = None):
+        if key is None:
+            key = self.tree_key()
+        with self._call_lock:
+            entry = self._call_cache.get(name)
+            owner = entry is None or entry[0] != key
+            if owner:
+                entry = self._call_cache[name] = (key, Future())
+        future = entry[1]
+        if not owner:
+            return future.result()
+
+        try:
+            report = fn(self)
+        except BaseException as e:
+            with self._call_lock:
+                if self._call_cache.get(name) is entry:
+                    del self._call_cache[name]
+            future.set_exception(e)
+            raise
+        future.set_result(report)
+        return report
+
+    return wrapper
+
+
+def _reset_executor():
+    """Drop a broken pool so the next _get_executor() starts a fresh one"""
+    global _EXECUTOR
+    with _EXECUTOR_LOCK:
+        if _EXECUTOR is not None:
+            shutdown_cancelling(_EXECUTOR, wait=False)
+            _EXECUTOR = None
+
+
+def _compile_one(path: str) -> Optional[str]:
+    """Compile one file in memory — error text, or None if it compiles
+
+    Runs in a worker process. Same check as py_compile, without writing
+    a .pyc; errors are formatted the way py_compile reports them.
+    """
+    try:
+        with open(path, "rb") as f:
+            source = f.read()
+    except OSError as e:
+        return str(e)
+    try:
+        compile(source, path, "exec", dont_inherit=True)
+    except Exception as e:  # SyntaxError, ValueError (null bytes), ...
+        return "".join(traceback.format_exception_only(type(e), e))
+    return None
+
+
+def _tree_fingerprint(root: str) -> Tuple[int, int]:
+    """(entry count, newest mtime_ns) of the tree — one os.scandir walk, no reads"""
+    count = newest = 0
+    stack = [root]
+    while stack:
+        try:
+            it = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with it:
+            for entry in it:
+                name = entry.name
+                if name in _FINGERPRINT_SKIP or name.endswith(".egg-info"):
+                    continue
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                count += 1
+                if st.st_mtime_ns > newest:
+                    newest = st.st_mtime_ns
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+    return count, newest
+
+
 class Validator:
     """Зрение агента — проверка что всё ок"""
 
     def __init__(self, project_dir: Path):
         self.project_dir = Path(project_dir)
+        # str form for os.path calls on hot paths — no Path object per probe
+        self._root = os.fspath(self.project_dir)
+        self.cache_file = self.project_dir / ".a1" / "validation.json"
+        self.checks_file = self.project_dir / ".a1" / "checks.json"
+        # method name -> (tree key, Future of its report); see _memoize_per_instance
+        self._call_cache: Dict[str, Tuple[str, Future]] = {}
+        self._call_lock = threading.Lock()
+
+    def invalidate_cache(self):
+        """Forget every remembered result — in memory and on disk"""
+        with self._call_lock:
+            self._call_cache.clear()
+        for path in (self.cache_file, self.checks_file):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
 
     def has_git(self) -> bool:
-        """Check if project has git initialized"""
-        return (self.project_dir / ".git").exists()
+        """Check if project has git initialized (and git is installed)"""
+        return os.path.exists(os.path.join(self._root, ".git")) and _which("git") is not None
+
+    def run_all(
+        self, use_cache: bool = True, key: Optional[str] = None
+    ) -> Dict[str, ValidationReport]:
+        """Запустить все проверки
+
+        Results are reused for CACHE_TTL seconds while the project tree
+        (and git HEAD/index) is unchanged; a run already in progress for the
+        same tree is joined rather than repeated. use_cache=False also
+        re-runs checks that _run_checks would reuse. key: tree_key(), if the
+        caller already computed it.
+        """
+        if key is None:
+            key = self.tree_key()
+        if use_cache:
+            cached = self._load_cache(key)
+            if cached is not None:
+                return cached
+
+        inflight_key = (self._root, key)
+        with _INFLIGHT_LOCK:
+            future = _INFLIGHT.get(inflight_key)
+            owner = future is None
+            if owner:
+                future = _INFLIGHT[inflight_key] = Future()
+        if not owner:
+            return future.result()
 
-    def run_all(self) -> Dict[str, ValidationReport]:
-        """Запустить все проверки"""
-        results = {}
+        try:
+            results = self._run_checks(use_cache, key)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with _INFLIGHT_LOCK:
+                del _INFLIGHT[inflight_key]
+        future.set_result(results)
+        self._save_cache(key, results)
+        return results
 
-        results["syntax"] = self._check_syntax()
-        results["tests"] = self._run_tests()
-        results["lint"] = self._run_lint()
-        results["build"] = self._check_build()
+    def _run_checks(self, use_cache: bool, key: str) -> Dict[str, ValidationReport]:
+        """Run every check
 
+        Checks are independent subprocess launches, so they run side by side;
+        results keep the fixed order below. lint is skipped (last OK report
+        reused) while its inputs are unchanged.
+        """
+        checks = {
+            "syntax": self._check_syntax,
+            "tests": self._run_tests,
+            "lint": self._run_lint,
+            "build": self._check_build,
+        }
         # Git checks (optional — works without git)
-        git_report = self._check_git()
-        if git_report:
-            results["git"] = git_report
-
+        if self.has_git():
+            checks["git"] = self._check_git
+
+        keys = self._check_keys()
+        memo = self._load_checks() if use_cache else {}
+        results: Dict[str, ValidationReport] = {}
+        with ThreadPoolExecutor(max_workers=len(checks)) as pool:
+            futures = {}
+            for name, fn in checks.items():
+                entry = memo.get(name)
+                if entry and name in keys and entry.get("key") == keys[name]:
+                    results[name] = _report_from_dict(entry["report"])
+                else:
+                    futures[name] = pool.submit(fn, key)
+            results.update({name: future.result() for name, future in futures.items()})
+        results = {name: results[name] for name in checks}
+
+        self._save_checks(keys, results)
         return results
 
+    def _check_keys(self) -> Dict[str, str]:
+        """Per-check input fingerprint: (path, mtime_ns, size) of the .py files,
+        its config files and the linter executable"""
+        py_stats = []
+        for path in self._project_py_files():
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            py_stats.append(f"{path}\0{st.st_mtime_ns}\0{st.st_size}")
+        py_stats.sort()
+
+        # An upgraded linter can report what the old one passed
+        linter = _which("ruff") or _which("flake8")
+        keys = {}
+        for name, configs in _CHECK_INPUTS.items():
+            h = hashlib.blake2b(digest_size=16)
+            for line in py_stats:
+                h.update(line.encode("utf-8", "surrogateescape") + b"\n")
+            # os.path.join keeps the linter's absolute path as is
+            for cfg in (*configs, linter) if linter else configs:
+                try:
+                    st = os.stat(os.path.join(self._root, cfg))
+                    h.update(f"{cfg}\0{st.st_mtime_ns}\0{st.st_size}\n".encode())
+                except OSError:
+                    h.update(f"{cfg}\0-\n".encode())
+            keys[name] = h.hexdigest()
+        return keys
+
+    def _load_checks(self) -> Dict[str, dict]:
+        try:
+            data = json.loads(self.checks_file.read_text())
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save_checks(self, keys: Dict[str, str], results: Dict[str, ValidationReport]):
+        """Remember OK reports of the memoized checks (anything else is re-run next time)"""
+        data = {
+            name: {"key": keys[name], "report": _report_to_dict(results[name])}
+            for name in keys
+            if name in results and results[name].result is ValidationResult.OK
+        }
+        try:
+            self.checks_file.parent.mkdir(parents=True, exist_ok=True)
+            self.checks_file.write_text(json.dumps(data, indent=2, ensure_ascii=False))
+        except OSError:
+            pass
+
+    def tree_key(self) -> str:
+        """Cheap fingerprint of the project: entry count + newest mtime, git HEAD/index mtimes
+
+        One walk of the tree — compute it once and pass it to run_all() and
+        check_criteria() when calling several of them for the same state.
+        """
+        count, newest = _tree_fingerprint(self._root)
+        git_mtimes = []
+        for name in ("HEAD", "index"):
+            try:
+                git_mtimes.append(os.stat(os.path.join(self._root, ".git", name)).st_mtime_ns)
+            except OSError:
+                git_mtimes.append(0)
+        return f"{count}:{newest}:{git_mtimes[0]}:{git_mtimes[1]}"
+
+    def _load_cache(self, key: str) -> Optional[Dict[str, ValidationReport]]:
+        try:
+            data = json.loads(self.cache_file.read_text())
+            if data["key"] != key or time.time() - data["ts"] > CACHE_TTL:
+                return None
+            return {name: _report_from_dict(r) for name, r in data["results"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+    def _save_cache(self, key: str, results: Dict[str, ValidationReport]):
+        data = {
+            "key": key,
+            "ts": time.time(),
+            "results": {name: _report_to_dict(r) for name, r in results.items()},
+        }
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            self.cache_file.write_text(json.dumps(data, indent=2, ensure_ascii=False))
+        except OSError:
+            pass
+
     def _run_command(
-        self, cmd: List[str], timeout: int = 60
+        self, cmd: List[str], timeout: int = 60, env: Optional[Dict[str, str]] = None,
+        tail: Optional[int] = None,
     ) -> Tuple[int, str, str]:
-        """Запустить команду и вернуть результат"""
+        """Запустить команду и вернуть результат (env: extra variables)
+
+        tail: keep only the last `tail` bytes of each stream — for commands
+        whose output can be huge but is only shown as its ending.
+        """
+        if tail is not None:
+            return self._run_command_tail(cmd, timeout, env, tail)
         try:
             result = subprocess.run(
                 cmd,
-                cwd=self.project_dir,
+                executable=_which(cmd[0]),
+                cwd=self._root,
+                close_fds=_CLOSE_FDS,
                 capture_output=True,
                 text=True,
                 timeout=timeout,
+                env={**os.environ, **env} if env else None,
             )
             return result.returncode, result.stdout, result.stderr
         except subprocess.TimeoutExpired:
@@ -68,9 +495,62 @@ class Validator:
         except FileNotFoundError:
             return -2, "", f"Command not found: {cmd[0]}"
 
+    def _run_command_tail(
+        self, cmd: List[str], timeout: int, env: Optional[Dict[str, str]], tail: int
+    ) -> Tuple[int, str, str]:
+        """_run_command reading both pipes incrementally into bounded buffers"""
+        try:
+            proc = subprocess.Popen(
+                cmd,
+                executable=_which(cmd[0]),
+                cwd=self._root,
+                close_fds=_CLOSE_FDS,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env={**os.environ, **env} if env else None,
+            )
+        except FileNotFoundError:
+            return -2, "", f"Command not found: {cmd[0]}"
+
+        out_fd, err_fd = proc.stdout.fileno(), proc.stderr.fileno()
+        bufs = {out_fd: bytearray(), err_fd: bytearray()}
+        deadline = time.monotonic() + timeout
+        try:
+            with selectors.DefaultSelector() as sel:
+                for stream in (proc.stdout, proc.stderr):
+                    sel.register(stream, selectors.EVENT_READ)
+                while sel.get_map():
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise subprocess.TimeoutExpired(cmd, timeout)
+                    for key, _ in sel.select(remaining):
+                        chunk = os.read(key.fd, 65536)
+                        if not chunk:
+                            sel.unregister(key.fileobj)
+                            continue
+                        buf = bufs[key.fd]
+                        buf += chunk
+                        if len(buf) > tail:
+                            del buf[:-tail]
+            code = proc.wait(max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            return -1, "", "Command timed out"
+        finally:
+            proc.stdout.close()
+            proc.stderr.close()
+
+        return (
+            code,
+            bufs[out_fd].decode("utf-8", "replace"),
+            bufs[err_fd].decode("utf-8", "replace"),
+        )
+
+    @_memoize_per_instance
     def _check_syntax(self) -> ValidationReport:
         """Проверить синтаксис Python файлов"""
-        py_files = list(self.project_dir.rglob("*.py"))
+        py_files = self._project_py_files()
 
         if not py_files:
             return ValidationReport(
@@ -78,13 +558,19 @@ class Validator:
                 message="No Python files found",
             )
 
+        # One pool of interpreters instead of a python process per file
         errors = []
-        for f in py_files:
-            code, stdout, stderr = self._run_command(
-                ["python", "-m", "py_compile", str(f)]
-            )
-            if code != 0:
-                errors.append(f"{f.name}: {stderr}")
+        try:
+            results = list(_get_executor().map(_compile_one, py_files, chunksize=8))
+        except (BrokenProcessPool, RuntimeError, OSError):
+            # e.g. spawn refused from an unguarded __main__ — fall back to
+            # one py_compile process per batch of files
+            _reset_executor()
+            errors = self._compile_batched(py_files)
+        else:
+            for path, err in zip(py_files, results):
+                if err:
+                    errors.append(f"{os.path.basename(path)}: {err}")
 
         if errors:
             return ValidationReport(
@@ -99,24 +585,88 @@ class Validator:
             message=f"Syntax OK ({len(py_files)} files)",
         )
 
+    def _compile_batched(self, py_files: List[str]) -> List[str]:
+        """Errors from `python -m py_compile` over all files, _PY_COMPILE_BATCH per call"""
+        errors = []
+        for i in range(0, len(py_files), _PY_COMPILE_BATCH):
+            code, stdout, stderr = self._run_command(
+                ["python", "-m", "py_compile", *py_files[i:i + _PY_COMPILE_BATCH]]
+            )
+            if code == 0:
+                continue
+            starts = list(_PY_COMPILE_ERR_RE.finditer(stderr))
+            if not starts:
+                errors.append(stderr.strip() or f"py_compile exited with {code}")
+            for m, nxt in zip(starts, starts[1:] + [None]):
+                block = stderr[m.start():nxt.start() if nxt else len(stderr)]
+                errors.append(f"{os.path.basename(m.group(1))}: {block}")
+        return errors
+
+    def _project_py_files(self) -> List[str]:
+        """The project's own .py files
+
+        With git: tracked plus untracked-but-not-ignored files (one
+        `git ls-files`), so .venv, vendored and build output covered by
+        .gitignore are never compiled. Without git: _iter_py_files().
+        """
+        if self.has_git():
+            code, stdout, _ = self._run_command(
+                ["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard",
+                 "--", "*.py"]
+            )
+            if code == 0:
+                root = self._root
+                paths = (os.path.join(root, p) for p in stdout.split("\0") if p)
+                # Skip files deleted from the work tree but still in the index
+                return [p for p in dict.fromkeys(paths) if os.path.isfile(p)]
+        return list(self._iter_py_files())
+
+    def _iter_py_files(self):
+        """Paths (str) of the project's .py files — one os.scandir walk,
+        pruning _PY_SKIP_DIRS instead of descending into them"""
+        stack = [self._root]
+        while stack:
+            try:
+                it = os.scandir(stack.pop())
+            except OSError:
+                continue
+            with it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in _PY_SKIP_DIRS:
+                            stack.append(entry.path)
+                    elif entry.name.endswith(".py"):
+                        yield entry.path
+
+    @_memoize_per_instance
     def _run_tests(self) -> ValidationReport:
         """Запустить тесты"""
-        # Пробуем pytest
-        code, stdout, stderr = self._run_command(
-            ["python", "-m", "pytest", "-v", "--tb=short"], timeout=120
-        )
+        if _which("python") is None:
+            return ValidationReport(
+                result=ValidationResult.SKIP,
+                message="No test framework found",
+            )
 
-        if code == -2:  # pytest не установлен
-            # Пробуем unittest
+        if _python_has_module("pytest"):
+            # Test files spread over CPUs if pytest-xdist is installed — in
+            # the interpreter that runs the tests, not necessarily ours
+            cmd = ["python", "-m", "pytest", "-v", "--tb=short"]
+            if _python_has_module("xdist"):
+                cmd += _XDIST_ARGS
+        else:
+            # pytest не установлен — пробуем unittest
+            cmd = ["python", "-m", "unittest", "discover", "-v"]
+        code, stdout, stderr = self._run_command(cmd, timeout=120, tail=_OUTPUT_TAIL)
+        if code == 1 and "No module named pytest" in stderr:
+            # Cached answer went stale (e.g. pyenv switched interpreters)
             code, stdout, stderr = self._run_command(
-                ["python", "-m", "unittest", "discover", "-v"]
+                ["python", "-m", "unittest", "discover", "-v"], tail=_OUTPUT_TAIL
+            )
+        elif code == 4 and "unrecognized arguments: -n" in stderr:
+            # Cached xdist answer went stale — run without it
+            code, stdout, stderr = self._run_command(
+                cmd[:-len(_XDIST_ARGS)], timeout=120, tail=_OUTPUT_TAIL
             )
-
-            if code == -2:
-                return ValidationReport(
-                    result=ValidationResult.SKIP,
-                    message="No test framework found",
-                )
 
         if code == 0:
             return ValidationReport(
@@ -139,22 +689,21 @@ class Validator:
                 command="pytest",
             )
 
+    @_memoize_per_instance
     def _run_lint(self) -> ValidationReport:
         """Запустить линтер"""
-        # Пробуем ruff (быстрый)
-        code, stdout, stderr = self._run_command(
-            ["ruff", "check", ".", "--output-format=concise"]
-        )
-
-        if code == -2:  # ruff не установлен
-            # Пробуем flake8
+        # Пробуем ruff (быстрый), потом flake8
+        if _which("ruff"):
+            code, stdout, stderr = self._run_command(
+                ["ruff", "check", ".", "--output-format=concise"]
+            )
+        elif _which("flake8"):
             code, stdout, stderr = self._run_command(["flake8", "."])
-
-            if code == -2:
-                return ValidationReport(
-                    result=ValidationResult.SKIP,
-                    message="No linter found (ruff/flake8)",
-                )
+        else:
+            return ValidationReport(
+                result=ValidationResult.SKIP,
+                message="No linter found (ruff/flake8)",
+            )
 
         if code == 0:
             return ValidationReport(
@@ -172,12 +721,13 @@ class Validator:
                 command="ruff check",
             )
 
+    @_memoize_per_instance
     def _check_build(self) -> ValidationReport:
         """Проверить что проект собирается"""
         # Python package
-        if (self.project_dir / "pyproject.toml").exists():
+        if os.path.exists(os.path.join(self._root, "pyproject.toml")):
             code, stdout, stderr = self._run_command(
-                ["python", "-m", "build", "--no-isolation"], timeout=120
+                ["python", "-m", "build", "--no-isolation"], timeout=120, tail=_OUTPUT_TAIL
             )
 
             if code == -2:
@@ -201,8 +751,13 @@ class Validator:
                 )
 
         # Node.js
-        if (self.project_dir / "package.json").exists():
-            code, stdout, stderr = self._run_command(["npm", "run", "build"])
+        if os.path.exists(os.path.join(self._root, "package.json")):
+            if _which("npm") is None:
+                return ValidationReport(
+                    result=ValidationResult.SKIP,
+                    message="npm not installed",
+                )
+            code, stdout, stderr = self._run_command(["npm", "run", "build"], tail=_OUTPUT_TAIL)
 
             if code == 0:
                 return ValidationReport(
@@ -228,22 +783,25 @@ class Validator:
             message="No build config found",
         )
 
+    @_memoize_per_instance
     def _check_git(self) -> Optional[ValidationReport]:
         """Check git status if git is available. Returns None if no git."""
         if not self.has_git():
             return None
 
-        # Check for changes
-        code, stdout, stderr = self._run_command(["git", "diff", "--stat"])
-        staged_code, staged_out, _ = self._run_command(["git", "diff", "--cached", "--stat"])
-        has_changes = bool(stdout.strip()) or bool(staged_out.strip())
-
-        # Check for untracked files
-        code, stdout, stderr = self._run_command(["git", "status", "--porcelain"])
-        lines = [l for l in stdout.strip().split("\n") if l.strip()]
-        untracked = [l for l in lines if l.startswith("??")]
+        # Staged, unstaged and untracked in one pass over the tree;
+        # read-only, so don't take the index lock to refresh it
+        code, stdout, stderr = self._run_command(
+            ["git", "-c", "core.untrackedCache=true", "status", "--porcelain=v2",
+             "--untracked-files=normal", "--no-renames"],
+            env={"GIT_OPTIONAL_LOCKS": "0"},
+        )
+        # v2 entries, one per line: "1"/"2" changed, "u" unmerged, "?" untracked
+        # (no "!" without --ignored) — counted in C, without splitting lines
+        untracked = stdout.count("\n? ") + stdout.startswith("? ")
+        has_changes = stdout.count("\n") > untracked
 
-        msg = f"Changes: {'yes' if has_changes else 'none'}, untracked: {len(untracked)}"
+        msg = f"Changes: {'yes' if has_changes else 'none'}, untracked: {untracked}"
         return ValidationReport(
             result=ValidationResult.OK,
             message=msg,
@@ -258,16 +816,42 @@ class Validator:
                 message="No files to check",
             )
 
-        missing = []
-        for fp in file_paths:
-            full = self.project_dir / fp
-            if not full.exists():
-                missing.append(fp)
+        root = self._root
+
+        def exists(fp: str) -> bool:
+            return os.path.exists(os.path.join(root, fp))
+
+        pool = None
+        if len(file_paths) >= _PARALLEL_STAT_MIN:
+            pool = ThreadPoolExecutor(max_workers=8)
+            found = pool.map(exists, file_paths)
+        else:
+            found = map(exists, file_paths)
+
+        # One pass: count, keep the first 5 names for the message, and on
+        # long lists stop once it is clearly failing
+        missing: List[str] = []
+        total_missing = 0
+        truncated = False
+        try:
+            for fp, ok in zip(file_paths, found):
+                if ok:
+                    continue
+                total_missing += 1
+                if len(missing) < 5:
+                    missing.append(fp)
+                if total_missing > _MISSING_EARLY_EXIT and len(file_paths) > _MISSING_EARLY_EXIT_MIN:
+                    truncated = True
+                    break
+        finally:
+            if pool is not None:
+                shutdown_cancelling(pool)
 
         if missing:
+            count = f"{total_missing}+" if truncated else str(total_missing)
             return ValidationReport(
                 result=ValidationResult.FAIL,
-                message=f"{len(missing)} files missing: {', '.join(missing[:5])}",
+                message=f"{count} files missing: {', '.join(missing)}",
             )
 
         return ValidationReport(
@@ -275,7 +859,7 @@ class Validator:
             message=f"All {len(file_paths)} files exist",
         )
 
-    def check_criteria(self, criteria: str) -> ValidationReport:
+    def check_criteria(self, criteria: str, key: Optional[str] = None) -> ValidationReport:
         """Check success_criteria using heuristics.
 
         Recognizes patterns:
@@ -283,12 +867,14 @@ class Validator:
         - "file X exists" → check file
         - "lint clean" / "no lint" → run linter
         - anything else → SKIP (can't verify programmatically)
+
+        key: tree_key(), if the caller already computed it.
         """
         cl = criteria.lower()
 
         # Tests pass?
         if ("test" in cl and "pass" in cl) or "pytest" in cl:
-            report = self._run_tests()
+            report = self._run_tests(key)
             return ValidationReport(
                 result=report.result,
                 message=f"Criteria '{criteria}': {report.message}",
@@ -298,7 +884,7 @@ class Validator:
 
         # Lint clean?
         if "lint" in cl and ("clean" in cl or "pass" in cl or "no " in cl):
-            report = self._run_lint()
+            report = self._run_lint(key)
             return ValidationReport(
                 result=report.result,
                 message=f"Criteria '{criteria}': {report.message}",
@@ -307,18 +893,11 @@ class Validator:
             )
 
         # File exists? (pattern: "file X exists" or "X.ext exists")
-        # Use ORIGINAL criteria for filename (not lowercased) to preserve case
-        import re
-        file_match = re.search(r"['\"]?(\S+\.\w{1,5})['\"]?\s+exist", cl)
-        if not file_match:
-            file_match = re.search(r"exist\w*\s+['\"]?(\S+\.\w{1,5})['\"]?", cl)
+        # Matched on the ORIGINAL criteria (not lowercased) to preserve case
+        file_match = _CRIT_FILE_EXIST_A.search(criteria) or _CRIT_FILE_EXIST_B.search(criteria)
         if file_match:
-            # Re-match on original criteria to get correct case
-            orig_match = re.search(r"['\"]?(\S+\.\w{1,5})['\"]?\s+exist", criteria, re.IGNORECASE)
-            if not orig_match:
-                orig_match = re.search(r"exist\w*\s+['\"]?(\S+\.\w{1,5})['\"]?", criteria, re.IGNORECASE)
-            fname = orig_match.group(1) if orig_match else file_match.group(1)
-            exists = (self.project_dir / fname).exists()
+            fname = file_match.group(1)
+            exists = os.path.exists(os.path.join(self._root, fname))
             return ValidationReport(
                 result=ValidationResult.OK if exists else ValidationResult.FAIL,
                 message=f"Criteria '{criteria}': file {'found' if exists else 'NOT found'}",
@@ -336,18 +915,11 @@ class Validator:
 
         lines = ["## Validation Results"]
 
-        icons = {
-            ValidationResult.OK: "[OK]",
-            ValidationResult.FAIL: "[FAIL]",
-            ValidationResult.SKIP: "[SKIP]",
-            ValidationResult.ERROR: "[ERR]",
-        }
-
         all_ok = True
         for name, report in results.items():
-            icon = icons.get(report.result, "?")
+            icon = _RESULT_ICONS.get(report.result, "?")
             lines.append(f"{icon} {name}: {report.message}")
-            if report.result == ValidationResult.FAIL:
+            if report.result is ValidationResult.FAIL:
                 all_ok = False
                 if report.details:
                     for line in report.details.split("\n")[:3]: